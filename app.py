@@ -4,264 +4,534 @@ Hostable on PythonAnywhere
 """
 
 from flask import Flask, render_template, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 import chess
-import os
+import chess.engine
 import sys
-from typing import Optional, Dict, List
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, FrozenSet, List, Tuple
+
+from game_outcome import TERMINATION_REASONS
+from stockfish_locator import find_stockfish
+from stockfish_pool import StockfishPool
 
 try:
-    from stockfish import Stockfish
+    import orjson
 except ImportError:
-    print("Warning: Stockfish not installed. Install with: pip install stockfish")
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Serialize responses with orjson, which is several times faster than json."""
+    
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 
 app = Flask(__name__)
 app.config['JSON_SORT_KEYS'] = False
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+
+# Evaluation tables (PIECE_VALUES is indexed by chess piece type)
+PIECE_VALUES = (0, 1, 3, 3.5, 5, 9, 0)
+WHITE_PAWN_RANK_BONUS = (0, 0, 10, 20, 30, 40, 50, 0)
+BLACK_PAWN_RANK_BONUS = (0, 50, 40, 30, 20, 10, 0, 0)
+CENTER_MASK = (chess.BB_D3 | chess.BB_E3 | chess.BB_D4 | chess.BB_E4 |
+               chess.BB_D5 | chess.BB_E5 | chess.BB_D6 | chess.BB_E6)
+
+# Transposition table bound flags
+TT_EXACT, TT_LOWER, TT_UPPER = 0, 1, 2
+TT_MAX_ENTRIES = 200000
+
+# Positions whose engine results are remembered per game
+ANALYSIS_CACHE_SIZE = 64
+
+# Engine analysis: search time and number of principal variations reported
+ANALYSIS_TIME_SECONDS = 1.0
+ANALYSIS_TOP_MOVES = 5
+HINT_CANDIDATES = 3
+
+# Game-over winner, keyed by chess.Outcome.winner
+GAME_OVER_WINNERS = {chess.WHITE: "White", chess.BLACK: "Black", None: "Draw"}
+
+# Located once at startup rather than on every request
+STOCKFISH_PATH = find_stockfish()
+
+# Stockfish think time per move (ms) by minimum skill level
+THINK_TIME_BY_SKILL = ((16, 1000), (11, 500), (6, 200), (0, 50))
+
+# Games idle for longer than this are dropped
+GAME_TTL_SECONDS = 30 * 60
+MAX_GAMES = 100
+
+
+class GameStore(OrderedDict):
+    """Game registry ordered by last use that holds at most max_games entries.
+    
+    Request threads share it, so every update happens under self.lock.
+    """
+    
+    def __init__(self, max_games: int):
+        super().__init__()
+        self.max_games = max_games
+        self.lock = threading.RLock()
+    
+    def __setitem__(self, game_id, game):
+        with self.lock:
+            super().__setitem__(game_id, game)
+            self.move_to_end(game_id)
+            while len(self) > self.max_games:
+                self.popitem(last=False)
+    
+    def touch(self, game_id):
+        """Return a game and mark it as the most recently used."""
+        with self.lock:
+            game = self.get(game_id)
+            if game:
+                self.move_to_end(game_id)
+                game.last_access = time.time()
+        return game
+    
+    def evict_idle(self, ttl_seconds: float):
+        """Drop games that have not been used within ttl_seconds."""
+        cutoff = time.time() - ttl_seconds
+        with self.lock:
+            while self:
+                oldest_id = next(iter(self))
+                if self[oldest_id].last_access >= cutoff:
+                    break
+                self.popitem(last=False)
+
 
 # Global game state
-games = {}
+games = GameStore(MAX_GAMES)
 game_counter = 0
 
+
+def _think_time_ms(skill_level: int) -> int:
+    """Weaker levels play instantly; only strong levels need the full second."""
+    for min_skill, think_ms in THINK_TIME_BY_SKILL:
+        if skill_level >= min_skill:
+            return think_ms
+    return THINK_TIME_BY_SKILL[-1][1]
+
+
+def _evaluation(score: chess.engine.Score) -> Dict:
+    """Express a White-relative engine score as {"type", "value"}."""
+    if score.is_mate():
+        return {"type": "mate", "value": score.mate()}
+    return {"type": "cp", "value": score.score()}
+
+
+def _top_move(info: Dict) -> Dict:
+    """One MultiPV line in the shape the frontend expects."""
+    score = info["score"].white()
+    return {
+        "Move": info["pv"][0].uci(),
+        "Centipawn": score.score(),
+        "Mate": score.mate(),
+    }
+
+
+# Stockfish engines shared by all games for the life of the process
+stockfish_pool = StockfishPool(STOCKFISH_PATH)
+
+
 class ChessGame:
-    """Manages a single chess game."""
+    """Manages a single chess game.
+    
+    Requests for the same game can run on different threads, so routes hold
+    self.lock while they use it: searches read the board and fill caches
+    that moves invalidate.
+    """
+    
+    __slots__ = (
+        "game_id", "board", "difficulty", "time_limit", "move_count",
+        "hints_used", "max_hints", "game_over", "winner", "reason", "moves",
+        "tt", "analysis_cache", "last_access", "lock",
+        "_fen_cache", "_legal_cache", "_legal_uci_cache",
+        "_legal_uci_set_cache", "_is_check_cache", "_snapshot_cache",
+    )
     
     def __init__(self, game_id: int, difficulty: int = 20, time_limit: Optional[int] = None):
         self.game_id = game_id
         self.board = chess.Board()
         self.difficulty = difficulty
         self.time_limit = time_limit  # in minutes
-        self.stockfish = self._init_stockfish()
         self.move_count = 0
         self.hints_used = 0
         self.max_hints = 5
         self.game_over = False
         self.winner = None
         self.reason = None
+        self.moves = ""  # space-separated UCI history, extended on every move
+        self.tt = {}  # transposition key -> (depth, score, flag, best_move)
+        self.analysis_cache = OrderedDict()  # fen -> cached best move / analysis
+        self.last_access = time.time()
+        self.lock = threading.RLock()
+        self._snapshot_cache = None  # ((move_count, hints_used), state dict)
+        self._invalidate_position_cache()
+    
+    def _invalidate_position_cache(self):
+        """Forget everything derived from the current position."""
+        self._fen_cache = None
+        self._legal_cache = None
+        self._legal_uci_cache = None
+        self._legal_uci_set_cache = None
+        self._is_check_cache = None
+    
+    def _fen(self) -> str:
+        """FEN of the current position, computed once per move."""
+        if self._fen_cache is None:
+            self._fen_cache = self.board.fen()
+        return self._fen_cache
+    
+    def _legal_moves(self) -> Tuple[chess.Move, ...]:
+        """Legal moves in the current position, generated once per move."""
+        if self._legal_cache is None:
+            self._legal_cache = tuple(self.board.legal_moves)
+        return self._legal_cache
+    
+    def _legal_uci(self) -> List[str]:
+        """Legal moves in UCI notation, converted once per move."""
+        if self._legal_uci_cache is None:
+            self._legal_uci_cache = list(map(chess.Move.uci, self._legal_moves()))
+        return self._legal_uci_cache
+    
+    def _legal_uci_set(self) -> FrozenSet[str]:
+        """Legal UCI strings for membership tests, built once per move."""
+        if self._legal_uci_set_cache is None:
+            self._legal_uci_set_cache = frozenset(self._legal_uci())
+        return self._legal_uci_set_cache
     
-    def _init_stockfish(self) -> Optional[Stockfish]:
-        """Initialize Stockfish engine."""
+    def _is_check(self) -> bool:
+        """Whether the side to move is in check, computed once per move."""
+        if self._is_check_cache is None:
+            self._is_check_cache = self.board.is_check()
+        return self._is_check_cache
+    
+    def _analysis_entry(self, fen: str) -> Dict:
+        """Return the cached analysis record for a position, evicting the oldest when full."""
+        entry = self.analysis_cache.get(fen)
+        if entry is None:
+            entry = self.analysis_cache[fen] = {}
+            if len(self.analysis_cache) > ANALYSIS_CACHE_SIZE:
+                self.analysis_cache.popitem(last=False)
+        else:
+            self.analysis_cache.move_to_end(fen)
+        return entry
+    
+    def get_best_move(self) -> Optional[str]:
+        """Get best move from Stockfish or fallback to minimax heuristic.
+        
+        Only engine moves are cached, keyed by the skill level they were
+        searched at (which also sets the think time), so a fallback move
+        never stands in for Stockfish once the engine is back.
+        """
+        entry = self._analysis_entry(self._fen())
+        cached = entry.get("best_move")
+        if cached and cached[0] == self.difficulty:
+            return cached[1]
+        
+        best_move = None
         try:
-            stockfish_path = None
-            
-            # Try common paths
-            paths = [
-                "stockfish.exe",
-                "stockfish",
-                r"C:\stockfish\stockfish.exe",
-                os.path.join(os.path.dirname(__file__), "stockfish.exe"),
-            ]
-            
-            for path in paths:
-                if os.path.exists(path):
-                    stockfish_path = path
-                    break
-            
-            if stockfish_path:
-                return Stockfish(
-                    path=stockfish_path,
-                    depth=20,
-                    parameters={
-                        "Skill Level": self.difficulty,
-                        "Threads": 2,
-                        "Hash": 128,
-                    }
-                )
+            with stockfish_pool.checkout(self.difficulty) as engine:
+                if engine:
+                    limit = chess.engine.Limit(time=_think_time_ms(self.difficulty) / 1000)
+                    move = engine.play(self.board, limit).move
+                    best_move = move.uci() if move else None
         except Exception as e:
             print(f"Stockfish error: {e}")
         
-        return None
-    
-    def get_best_move(self, depth: int = 15) -> Optional[str]:
-        """Get best move from Stockfish or fallback to minimax heuristic."""
-        if self.stockfish:
-            try:
-                self.stockfish.set_fen_position(self.board.fen())
-                return self.stockfish.get_best_move_time(1000)
-            except Exception as e:
-                print(f"Stockfish error: {e}")
+        if best_move:
+            entry["best_move"] = (self.difficulty, best_move)
+            return best_move
         
         # Fallback: Use minimax with lookahead
         return self._minimax_move(depth=2)
     
+    def analyze_position(self) -> Optional[Dict]:
+        """Get Stockfish's evaluation and top moves, or None if no engine is available."""
+        fen = self._fen()
+        entry = self._analysis_entry(fen)
+        if "analysis" not in entry:
+            with stockfish_pool.checkout(self.difficulty) as engine:
+                if not engine:
+                    return None
+                # One MultiPV search gives both the evaluation and the top moves
+                lines = engine.analyse(self.board, chess.engine.Limit(time=ANALYSIS_TIME_SECONDS),
+                                       multipv=ANALYSIS_TOP_MOVES)
+            top_moves = [_top_move(line) for line in lines if line.get("pv")]
+            # The principal line's score is the position's evaluation
+            evaluation = _evaluation(lines[0]["score"].white()) if lines and "score" in lines[0] else None
+            entry["analysis"] = {
+                "evaluation": evaluation,
+                "best_move": top_moves[0]["Move"] if top_moves else None,
+                "top_moves": top_moves
+            }
+        return entry["analysis"]
+    
     def _minimax_move(self, depth: int = 2) -> Optional[str]:
-        """Use minimax algorithm with lookahead."""
+        """Use iterative-deepening minimax with lookahead."""
+        if len(self.tt) > TT_MAX_ENTRIES:
+            self.tt.clear()
+        
+        # Each iteration seeds the next one's move ordering with its best move,
+        # and the transposition table is kept across iterations.
         best_move = None
-        best_score = -float('inf')
+        for current_depth in range(1, depth + 1):
+            _, best_move = self._minimax_root(current_depth, best_move)
         
-        for move in self.board.legal_moves:
+        return best_move.uci() if best_move else None
+    
+    def _minimax_root(self, depth: int, prev_best: Optional[chess.Move] = None) -> Tuple[float, Optional[chess.Move]]:
+        """Search all root moves to the given depth, trying prev_best first."""
+        maximizing = self.board.turn == chess.WHITE
+        alpha, beta = -float('inf'), float('inf')
+        best_score = None
+        best_move = None
+        
+        for move in self._ordered_moves(prev_best):
             self.board.push(move)
-            score = -self._minimax(depth - 1, -float('inf'), float('inf'), not self.board.turn)
+            score = self._minimax(depth - 1, alpha, beta, not maximizing)
             self.board.pop()
             
-            if score > best_score:
+            if best_move is None or (score > best_score if maximizing else score < best_score):
                 best_score = score
                 best_move = move
+            if maximizing:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
         
-        return best_move.uci() if best_move else None
+        return best_score, best_move
+    
+    def _ordered_moves(self, tt_move: Optional[chess.Move] = None) -> List[chess.Move]:
+        """Legal moves ordered for alpha-beta: TT move, captures by MVV-LVA, then quiet moves."""
+        board = self.board
+        
+        def order_key(move: chess.Move) -> float:
+            if move == tt_move:
+                return -1e9
+            if board.is_capture(move):
+                victim = board.piece_type_at(move.to_square) or chess.PAWN  # en passant
+                attacker = board.piece_type_at(move.from_square)
+                return -(10 * PIECE_VALUES[victim] - PIECE_VALUES[attacker])
+            return 0
+        
+        return sorted(board.legal_moves, key=order_key)
     
     def _minimax(self, depth: int, alpha: float, beta: float, is_maximizing: bool) -> float:
-        """Minimax with alpha-beta pruning."""
+        """Minimax with alpha-beta pruning and a transposition table."""
+        key = (self.board._transposition_key(), is_maximizing)
+        entry = self.tt.get(key)
+        tt_move = entry[3] if entry else None
+        if entry and entry[0] >= depth:
+            tt_score, tt_flag = entry[1], entry[2]
+            if tt_flag == TT_EXACT:
+                return tt_score
+            if tt_flag == TT_LOWER:
+                alpha = max(alpha, tt_score)
+            else:
+                beta = min(beta, tt_score)
+            if beta <= alpha:
+                return tt_score
+        
         # Terminal conditions
         if depth == 0 or self.board.is_game_over():
-            return self._evaluate_position()
+            score = self._evaluate_position()
+            self.tt[key] = (depth, score, TT_EXACT, None)
+            return score
+        
+        alpha_orig, beta_orig = alpha, beta
+        best_move = None
         
         if is_maximizing:
-            max_eval = -float('inf')
-            for move in self.board.legal_moves:
+            best_eval = -float('inf')
+            for move in self._ordered_moves(tt_move):
                 self.board.push(move)
                 eval_score = self._minimax(depth - 1, alpha, beta, False)
                 self.board.pop()
-                max_eval = max(max_eval, eval_score)
+                if eval_score > best_eval:
+                    best_eval = eval_score
+                    best_move = move
                 alpha = max(alpha, eval_score)
                 if beta <= alpha:
                     break
-            return max_eval
         else:
-            min_eval = float('inf')
-            for move in self.board.legal_moves:
+            best_eval = float('inf')
+            for move in self._ordered_moves(tt_move):
                 self.board.push(move)
                 eval_score = self._minimax(depth - 1, alpha, beta, True)
                 self.board.pop()
-                min_eval = min(min_eval, eval_score)
+                if eval_score < best_eval:
+                    best_eval = eval_score
+                    best_move = move
                 beta = min(beta, eval_score)
                 if beta <= alpha:
                     break
-            return min_eval
+        
+        if best_eval <= alpha_orig:
+            flag = TT_UPPER
+        elif best_eval >= beta_orig:
+            flag = TT_LOWER
+        else:
+            flag = TT_EXACT
+        self.tt[key] = (depth, best_eval, flag, best_move)
+        return best_eval
     
     def _evaluate_position(self) -> float:
         """Evaluate current board position."""
-        # Checkmate = game over
-        if self.board.is_checkmate():
-            return 10000 if self.board.turn == chess.WHITE else -10000
+        board = self.board
+        in_check = board.is_check()
+        legal_count = board.legal_moves.count()
         
-        if self.board.is_stalemate():
+        # No legal moves: checkmate or stalemate
+        if legal_count == 0:
+            if in_check:
+                return -10000 if board.turn == chess.WHITE else 10000
             return 0
         
         score = 0.0
+        white = board.occupied_co[chess.WHITE]
+        black = board.occupied_co[chess.BLACK]
         
         # 1. Material count (piece values)
-        piece_values = {
-            chess.PAWN: 1, chess.KNIGHT: 3, chess.BISHOP: 3.5,
-            chess.ROOK: 5, chess.QUEEN: 9
-        }
-        
-        for sq in chess.SQUARES:
-            piece = self.board.piece_at(sq)
-            if piece:
-                value = piece_values.get(piece.piece_type, 0)
-                score += value if piece.color == chess.WHITE else -value
+        for piece_type in (chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN):
+            score += PIECE_VALUES[piece_type] * (chess.popcount(board.pieces_mask(piece_type, chess.WHITE)) -
+                                                 chess.popcount(board.pieces_mask(piece_type, chess.BLACK)))
         
         # 2. Check threat bonus
-        if self.board.is_check():
-            score += 500 if self.board.turn == chess.BLACK else -500
+        if in_check:
+            score += 500 if board.turn == chess.BLACK else -500
         
         # 3. Pawn advancement (pawns closer to promotion)
-        for sq in chess.SQUARES:
-            piece = self.board.piece_at(sq)
-            if piece and piece.piece_type == chess.PAWN:
-                rank = sq // 8
-                if piece.color == chess.WHITE:
-                    score += (rank - 1) * 10  # Promote advancing white pawns
-                else:
-                    score -= (6 - rank) * 10  # Promote advancing black pawns
+        white_pawns = board.pawns & white
+        black_pawns = board.pawns & black
+        for rank in range(1, 7):
+            score += chess.popcount(white_pawns & chess.BB_RANKS[rank]) * WHITE_PAWN_RANK_BONUS[rank]
+            score -= chess.popcount(black_pawns & chess.BB_RANKS[rank]) * BLACK_PAWN_RANK_BONUS[rank]
         
         # 4. King safety
-        white_king = self.board.king(chess.WHITE)
-        black_king = self.board.king(chess.BLACK)
+        white_king = board.king(chess.WHITE)
+        black_king = board.king(chess.BLACK)
         
         # Penalty for exposed king
-        white_king_attacks = len(list(self.board.attackers(chess.BLACK, white_king)))
-        black_king_attacks = len(list(self.board.attackers(chess.WHITE, black_king)))
+        white_king_attacks = chess.popcount(board.attackers_mask(chess.BLACK, white_king))
+        black_king_attacks = chess.popcount(board.attackers_mask(chess.WHITE, black_king))
         
         score -= white_king_attacks * 50
         score += black_king_attacks * 50
         
-        # 5. Piece activity (betweenness centrality)
-        for sq in chess.SQUARES:
-            piece = self.board.piece_at(sq)
-            if piece:
-                legal_moves = len([m for m in self.board.legal_moves if m.from_square == sq])
-                if piece.color == chess.WHITE:
-                    score += legal_moves * 0.5
-                else:
-                    score -= legal_moves * 0.5
+        # 5. Piece activity (mobility of both sides, counted once)
+        mobility = legal_count
+        board.turn = not board.turn
+        mobility -= board.pseudo_legal_moves.count()
+        board.turn = not board.turn
+        score += mobility * 0.5 if board.turn == chess.WHITE else -mobility * 0.5
         
         # 6. Center control
-        center_squares = [chess.D4, chess.E4, chess.D5, chess.E5, 
-                         chess.D3, chess.E3, chess.D6, chess.E6]
-        for sq in center_squares:
-            piece = self.board.piece_at(sq)
-            if piece:
-                score += 20 if piece.color == chess.WHITE else -20
+        score += 20 * (chess.popcount(CENTER_MASK & white) - chess.popcount(CENTER_MASK & black))
         
         return score
     
-        return score
-    
     def make_move(self, move_uci: str) -> bool:
         """Make a move on the board."""
         try:
-            move = chess.Move.from_uci(move_uci)
-            if move in self.board.legal_moves:
-                self.board.push(move)
-                self.move_count += 1
-                self._check_game_over()
+            # Membership in the cached set already proves legality
+            if move_uci in self._legal_uci_set():
+                self._push(move_uci)
                 return True
         except Exception:
             pass
         return False
     
+    def _push(self, move_uci: str):
+        """Play a move known to be legal and update the game state."""
+        self.board.push(chess.Move.from_uci(move_uci))
+        self._invalidate_position_cache()
+        self.moves = f"{self.moves} {move_uci}" if self.moves else move_uci
+        self.move_count += 1
+        self._check_game_over()
+    
     def get_engine_move(self) -> Optional[str]:
         """Get best move and make it."""
         best_move = self.get_best_move()
         
-        if best_move and self.make_move(best_move):
-            return best_move
-        return None
+        # Engine and minimax moves come from the legal move list, so they
+        # skip make_move's validation
+        if best_move:
+            self._push(best_move)
+        return best_move
     
-    def get_hint(self) -> Optional[str]:
-        """Get a hint (limited to 5 per game)."""
+    def get_hint(self) -> Optional[List[Dict]]:
+        """Get the best few candidate moves, strongest first (limited to 5 hints per game)."""
         if self.hints_used >= self.max_hints:
             return None
         
         self.hints_used += 1
-        return self.get_best_move()
+        # The MultiPV analysis ranks several moves in the time one would take,
+        # and stays cached for /api/analysis on the same position
+        try:
+            analysis = self.analyze_position()
+        except Exception as e:
+            print(f"Stockfish error: {e}")
+            analysis = None
+        if analysis and analysis["top_moves"]:
+            return analysis["top_moves"][:HINT_CANDIDATES]
+        
+        best_move = self.get_best_move()
+        if best_move is None:
+            return None
+        return [{"Move": best_move, "Centipawn": None, "Mate": None}]
     
     def _check_game_over(self):
         """Check if game is over."""
-        if self.board.is_game_over():
-            self.game_over = True
-            
-            if self.board.is_checkmate():
-                self.winner = "Black" if self.board.turn == chess.WHITE else "White"
-                self.reason = "Checkmate"
-            elif self.board.is_stalemate():
-                self.winner = "Draw"
-                self.reason = "Stalemate"
-            elif self.board.is_insufficient_material():
-                self.winner = "Draw"
-                self.reason = "Insufficient material"
-            else:
-                self.winner = "Draw"
-                self.reason = "Game ended"
-    
-    def to_dict(self) -> Dict:
-        """Convert game state to JSON-serializable dict."""
-        return {
-            "game_id": self.game_id,
-            "fen": self.board.fen(),
-            "pgn": str(self.board.move_stack),
-            "turn": "White" if self.board.turn == chess.WHITE else "Black",
-            "is_check": self.board.is_check(),
-            "legal_moves": [move.uci() for move in self.board.legal_moves],
-            "move_count": self.move_count,
-            "hints_used": self.hints_used,
-            "max_hints": self.max_hints,
-            "game_over": self.game_over,
-            "winner": self.winner,
-            "reason": self.reason,
-            "difficulty": self.difficulty,
-            "time_limit": self.time_limit,
-        }
+        outcome = self.board.outcome()
+        if outcome is None:
+            return
+        
+        self.game_over = True
+        self.winner = GAME_OVER_WINNERS[outcome.winner]
+        self.reason = TERMINATION_REASONS.get(outcome.termination, "Game ended")
+    
+    def to_dict(self, include_moves: bool = True) -> Dict:
+        """Convert game state to JSON-serializable dict.
+        
+        With include_moves=False the legal move list and move history are
+        left out, which skips legal-move generation for clients that only
+        need the position and status.
+        """
+        state = self._snapshot()
+        if include_moves:
+            return {**state, "moves": self.moves, "legal_moves": self._legal_uci()}
+        return state
+    
+    def _snapshot(self) -> Dict:
+        """Position and status fields, rebuilt only after a move or a hint."""
+        version = (self.move_count, self.hints_used)
+        if self._snapshot_cache is None or self._snapshot_cache[0] != version:
+            self._snapshot_cache = (version, {
+                "game_id": self.game_id,
+                "fen": self._fen(),
+                "turn": "White" if self.board.turn == chess.WHITE else "Black",
+                "is_check": self._is_check(),
+                "move_count": self.move_count,
+                "hints_used": self.hints_used,
+                "max_hints": self.max_hints,
+                "game_over": self.game_over,
+                "winner": self.winner,
+                "reason": self.reason,
+                "difficulty": self.difficulty,
+                "time_limit": self.time_limit,
+            })
+        return self._snapshot_cache[1]
 
 
 # Routes
@@ -280,90 +550,105 @@ def new_game():
     difficulty = data.get('difficulty', 20)
     time_limit = data.get('time_limit')
     
-    game_counter += 1
-    game = ChessGame(game_counter, difficulty, time_limit)
-    games[game_counter] = game
+    games.evict_idle(GAME_TTL_SECONDS)
+    
+    with games.lock:
+        game_counter += 1
+        game = ChessGame(game_counter, difficulty, time_limit)
+        games[game_counter] = game
     
     return jsonify({
         "success": True,
-        "game_id": game_counter,
+        "game_id": game.game_id,
         "game": game.to_dict()
     })
 
 @app.route('/api/game/<int:game_id>')
 def get_game(game_id: int):
-    """Get game state."""
-    game = games.get(game_id)
+    """Get game state (pass ?fields=minimal to omit legal moves and history)."""
+    game = games.touch(game_id)
     if not game:
         return jsonify({"error": "Game not found"}), 404
     
-    return jsonify({"success": True, "game": game.to_dict()})
+    include_moves = request.args.get('fields') != 'minimal'
+    
+    with game.lock:
+        # The state only changes through moves and hints, so pollers that
+        # already hold this version get an empty 304
+        etag = f"{game.game_id}-{game.move_count}-{game.hints_used}"
+        if not include_moves:
+            etag += "-minimal"
+        if request.if_none_match.contains_weak(etag):
+            return "", 304
+        
+        response = jsonify({"success": True, "game": game.to_dict(include_moves)})
+    response.set_etag(etag, weak=True)
+    return response
 
 @app.route('/api/move/<int:game_id>', methods=['POST'])
 def make_move(game_id: int):
-    """Make a player move."""
-    game = games.get(game_id)
+    """Make a player move (pass ?fields=minimal to omit legal moves and history)."""
+    game = games.touch(game_id)
     if not game:
         return jsonify({"error": "Game not found"}), 404
     
     data = request.json
     move_uci = data.get('move')
+    include_moves = request.args.get('fields') != 'minimal'
     
-    # Handle automatic bot move
-    if move_uci == 'auto':
-        if game.game_over:
-            return jsonify({"error": "Game is over"}), 400
+    with game.lock:
+        # Handle automatic bot move
+        if move_uci == 'auto':
+            if game.game_over:
+                return jsonify({"error": "Game is over"}), 400
+            
+            engine_move = game.get_engine_move()
+            if not engine_move:
+                return jsonify({"error": "Could not generate move"}), 400
+            
+            return jsonify({"success": True, "game": game.to_dict(include_moves)})
         
-        engine_move = game.get_engine_move()
-        if not engine_move:
-            return jsonify({"error": "Could not generate move"}), 400
+        # Handle user move
+        if not move_uci or not game.make_move(move_uci):
+            return jsonify({"error": "Invalid move"}), 400
         
-        return jsonify({"success": True, "game": game.to_dict()})
-    
-    # Handle user move
-    if not move_uci or not game.make_move(move_uci):
-        return jsonify({"error": "Invalid move"}), 400
-    
-    return jsonify({"success": True, "game": game.to_dict()})
+        return jsonify({"success": True, "game": game.to_dict(include_moves)})
 
 @app.route('/api/hint/<int:game_id>')
 def get_hint(game_id: int):
     """Get a hint for the current position."""
-    game = games.get(game_id)
+    game = games.touch(game_id)
     if not game:
         return jsonify({"error": "Game not found"}), 404
     
-    hint = game.get_hint()
-    if hint is None:
+    with game.lock:
+        candidates = game.get_hint()
+        if candidates is None:
+            return jsonify({
+                "success": False,
+                "error": f"No hints remaining. Used {game.hints_used}/{game.max_hints}"
+            }), 400
+        
         return jsonify({
-            "success": False,
-            "error": f"No hints remaining. Used {game.hints_used}/{game.max_hints}"
-        }), 400
-    
-    return jsonify({
-        "success": True,
-        "hint": hint,
-        "hints_used": game.hints_used,
-        "max_hints": game.max_hints
-    })
+            "success": True,
+            "hint": candidates[0]["Move"],
+            "candidates": candidates,
+            "hints_used": game.hints_used,
+            "max_hints": game.max_hints
+        })
 
 @app.route('/api/analysis/<int:game_id>')
 def analyze_position(game_id: int):
     """Analyze current position."""
-    game = games.get(game_id)
-    if not game or not game.stockfish:
+    game = games.touch(game_id)
+    if not game:
         return jsonify({"error": "Game not found or engine unavailable"}), 404
     
     try:
-        game.stockfish.set_fen_position(game.board.fen())
-        top_moves = game.stockfish.get_top_moves(5)
-        evaluation = game.stockfish.get_evaluation()
-        
-        analysis = {
-            "evaluation": evaluation,
-            "top_moves": top_moves
-        }
-        
+        with game.lock:
+            analysis = game.analyze_position()
+        if analysis is None:
+            return jsonify({"error": "Game not found or engine unavailable"}), 404
         return jsonify({"success": True, "analysis": analysis})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -374,4 +659,8 @@ def health():
     return jsonify({"status": "ok", "message": "Chess Arena API is running"})
 
 if __name__ == '__main__':
-    app.run(debug=False, host='0.0.0.0', port=5000)
+    stockfish_pool.warm()
+    # Engine searches wait on the pool's event loop without holding the GIL,
+    # so one thread per request lets searches for different games overlap;
+    # requests for the same game queue on its lock
+    app.run(debug=False, host='0.0.0.0', port=5000, threaded=True)
@@ -4,11 +4,57 @@ A powerful chess engine for educational purposes and practice.
 """
 
 import chess
+import chess.engine
 import chess.svg
 import os
 import sys
 from typing import Optional, Tuple
-import platform
+
+from game_outcome import TERMINATION_REASONS
+from stockfish_hash import hash_budget_mb
+from stockfish_locator import find_stockfish
+
+# Located once at import rather than for every engine instance
+STOCKFISH_PATH = find_stockfish()
+
+
+def _score_dict(score: chess.engine.PovScore) -> dict:
+    """An engine score as {"type": "cp" | "mate", "value": ...} from White's side."""
+    white = score.white()
+    if white.is_mate():
+        return {"type": "mate", "value": white.mate()}
+    return {"type": "cp", "value": white.score()}
+
+
+def _eval_lines(evaluation: dict):
+    """Describe an evaluation in one or two lines of text."""
+    if evaluation["type"] == "cp":
+        score = evaluation["value"] / 100
+        yield f"Evaluation: {score:+.2f} pawns"
+        if score > 2:
+            yield "White is winning"
+        elif score > 0.5:
+            yield "White has an advantage"
+        elif score < -2:
+            yield "Black is winning"
+        elif score < -0.5:
+            yield "Black has an advantage"
+        else:
+            yield "Position is roughly equal"
+    elif evaluation["type"] == "mate":
+        yield f"Mate in {evaluation['value']} moves!"
+
+
+def _fmt_move(rank: int, move_info: dict) -> str:
+    """Format one of Stockfish's top moves as a numbered line."""
+    move = move_info.get("Move", "?")
+    mate = move_info.get("Mate")
+    if mate:
+        return f"  {rank}. {move} (Mate in {mate})"
+    centipawn = move_info.get("Centipawn")
+    if centipawn is not None:
+        return f"  {rank}. {move} ({centipawn/100:+.2f})"
+    return f"  {rank}. {move}"
 
 
 class ChessEngine:
@@ -27,77 +73,48 @@ class ChessEngine:
         self.skill_level = skill_level
         self.depth = depth
         self.think_time = think_time
-        self.stockfish = None
+        self.stockfish: Optional[chess.engine.SimpleEngine] = None
         self.move_history = []
+        # Passed to every search as its game; python-chess sends ucinewgame
+        # (which clears Stockfish's hash) only when it changes
+        self._game = 0
         
         self._init_stockfish()
     
     def _init_stockfish(self):
-        """Initialize Stockfish engine."""
+        """Start the Stockfish process that serves every search of the session."""
         try:
-            from stockfish import Stockfish
-            
-            # Try common Stockfish paths
-            stockfish_paths = []
-            
-            if platform.system() == "Windows":
-                stockfish_paths = [
-                    "stockfish.exe",
-                    "stockfish",
-                    r"C:\stockfish\stockfish.exe",
-                    r"C:\Program Files\Stockfish\stockfish.exe",
-                    os.path.join(os.path.dirname(__file__), "stockfish.exe"),
-                ]
-            else:
-                stockfish_paths = [
-                    "stockfish",
-                    "/usr/bin/stockfish",
-                    "/usr/local/bin/stockfish",
-                    "/usr/games/stockfish",
-                    os.path.join(os.path.dirname(__file__), "stockfish"),
-                ]
-            
-            stockfish_path = None
-            for path in stockfish_paths:
-                if os.path.exists(path) or self._check_command_exists(path):
-                    stockfish_path = path
-                    break
-            
-            if stockfish_path:
-                self.stockfish = Stockfish(
-                    path=stockfish_path,
-                    depth=self.depth,
-                    parameters={
-                        "Skill Level": self.skill_level,
-                        "Threads": 4,
-                        "Hash": 256,
-                        "Minimum Thinking Time": int(self.think_time * 1000)
-                    }
-                )
+            if STOCKFISH_PATH:
+                self.stockfish = chess.engine.SimpleEngine.popen_uci(STOCKFISH_PATH)
+                self.stockfish.configure({
+                    "Skill Level": self.skill_level,
+                    "Threads": os.cpu_count() or 2,
+                    "Hash": hash_budget_mb(),
+                })
                 print(f"Stockfish initialized at skill level {self.skill_level}/20")
             else:
                 print("WARNING: Stockfish not found. Please install it.")
                 print("Download from: https://stockfishchess.org/download/")
                 self.stockfish = None
                 
-        except ImportError:
-            print("Stockfish module not installed. Run: pip install stockfish")
-            self.stockfish = None
         except Exception as e:
             print(f"Error initializing Stockfish: {e}")
-            self.stockfish = None
+            self.close()
     
-    def _check_command_exists(self, command: str) -> bool:
-        """Check if a command exists in system PATH."""
-        import shutil
-        return shutil.which(command) is not None
+    def close(self):
+        """Shut Stockfish down; its process would otherwise keep Python from exiting."""
+        if self.stockfish:
+            try:
+                self.stockfish.quit()
+            except Exception:
+                pass
+            self.stockfish = None
     
     def reset(self):
         """Reset the board to starting position."""
         self.board = chess.Board()
         self.move_history = []
-        if self.stockfish:
-            self.stockfish.set_position([])
+        self._game += 1
         print("Board reset to starting position.")
     
     def display_board(self):
@@ -131,8 +148,6 @@ class ChessEngine:
             if move in self.board.legal_moves:
                 self.board.push(move)
                 self.move_history.append(move_str)
-                if self.stockfish:
-                    self.stockfish.set_position(self.move_history)
                 return True
         except ValueError:
             pass
@@ -144,8 +159,6 @@ class ChessEngine:
                 uci_move = move.uci()
                 self.board.push(move)
                 self.move_history.append(uci_move)
-                if self.stockfish:
-                    self.stockfish.set_position(self.move_history)
                 return True
         except ValueError:
             pass
@@ -160,9 +173,9 @@ class ChessEngine:
             return self._get_fallback_move()
         
         try:
-            self.stockfish.set_fen_position(self.board.fen())
-            best_move = self.stockfish.get_best_move_time(int(self.think_time * 1000))
-            return best_move
+            limit = chess.engine.Limit(time=self.think_time)
+            result = self.stockfish.play(self.board, limit, game=self._game)
+            return result.move.uci() if result.move else None
         except Exception as e:
             print(f"Engine error: {e}")
             return self._get_fallback_move()
@@ -192,9 +205,9 @@ class ChessEngine:
             return {"type": "none", "value": 0}
         
         try:
-            self.stockfish.set_fen_position(self.board.fen())
-            evaluation = self.stockfish.get_evaluation()
-            return evaluation
+            limit = chess.engine.Limit(depth=self.depth)
+            info = self.stockfish.analyse(self.board, limit, game=self._game)
+            return _score_dict(info["score"])
         except Exception:
             return {"type": "none", "value": 0}
     
@@ -204,8 +217,18 @@ class ChessEngine:
             return []
         
         try:
-            self.stockfish.set_fen_position(self.board.fen())
-            return self.stockfish.get_top_moves(n)
+            limit = chess.engine.Limit(depth=self.depth)
+            top_moves = []
+            for info in self.stockfish.analyse(self.board, limit, multipv=n, game=self._game):
+                if "pv" not in info or "score" not in info:
+                    continue
+                white = info["score"].white()
+                top_moves.append({
+                    "Move": info["pv"][0].uci(),
+                    "Centipawn": white.score(),
+                    "Mate": white.mate(),
+                })
+            return top_moves
         except Exception:
             return []
     
@@ -215,30 +238,20 @@ class ChessEngine:
     
     def get_game_result(self) -> str:
         """Get the result of the game."""
-        if not self.is_game_over():
+        outcome = self.board.outcome()
+        if outcome is None:
             return "Game in progress"
         
-        if self.board.is_checkmate():
-            winner = "Black" if self.board.turn else "White"
+        if outcome.termination == chess.Termination.CHECKMATE:
+            winner = "White" if outcome.winner == chess.WHITE else "Black"
             return f"Checkmate! {winner} wins!"
-        elif self.board.is_stalemate():
-            return "Stalemate - Draw!"
-        elif self.board.is_insufficient_material():
-            return "Insufficient material - Draw!"
-        elif self.board.is_fifty_moves():
-            return "50-move rule - Draw!"
-        elif self.board.is_repetition():
-            return "Threefold repetition - Draw!"
-        else:
-            return "Game over - Draw!"
+        return f"{TERMINATION_REASONS.get(outcome.termination, 'Game over')} - Draw!"
     
     def undo_move(self) -> bool:
         """Undo the last move."""
         if len(self.move_history) > 0:
             self.board.pop()
             self.move_history.pop()
-            if self.stockfish:
-                self.stockfish.set_position(self.move_history)
             return True
         return False
     
@@ -251,48 +264,28 @@ class ChessEngine:
         """
         self.skill_level = max(0, min(20, level))
         if self.stockfish:
-            self.stockfish.update_engine_parameters({"Skill Level": self.skill_level})
+            self.stockfish.configure({"Skill Level": self.skill_level})
         print(f"Difficulty set to {self.skill_level}/20")
     
     def analyze_position(self) -> str:
         """Analyze the current position."""
-        evaluation = self.get_evaluation()
         top_moves = self.get_top_moves(3)
+        # The best line's score is the evaluation, so only search a second
+        # time when the MultiPV search gave nothing back (no legal moves)
+        if top_moves and top_moves[0].get("Mate") is not None:
+            evaluation = {"type": "mate", "value": top_moves[0]["Mate"]}
+        elif top_moves and top_moves[0].get("Centipawn") is not None:
+            evaluation = {"type": "cp", "value": top_moves[0]["Centipawn"]}
+        else:
+            evaluation = self.get_evaluation()
         
-        analysis = []
-        analysis.append("\n=== Position Analysis ===")
-        
-        if evaluation["type"] == "cp":
-            score = evaluation["value"] / 100
-            analysis.append(f"Evaluation: {score:+.2f} pawns")
-            if score > 2:
-                analysis.append("White is winning")
-            elif score > 0.5:
-                analysis.append("White has an advantage")
-            elif score < -2:
-                analysis.append("Black is winning")
-            elif score < -0.5:
-                analysis.append("Black has an advantage")
-            else:
-                analysis.append("Position is roughly equal")
-        elif evaluation["type"] == "mate":
-            analysis.append(f"Mate in {evaluation['value']} moves!")
-        
+        lines = ["\n=== Position Analysis ==="]
+        lines.extend(_eval_lines(evaluation))
         if top_moves:
-            analysis.append("\nBest moves:")
-            for i, move_info in enumerate(top_moves, 1):
-                move = move_info.get("Move", "?")
-                centipawn = move_info.get("Centipawn")
-                mate = move_info.get("Mate")
-                
-                if mate:
-                    analysis.append(f"  {i}. {move} (Mate in {mate})")
-                elif centipawn is not None:
-                    analysis.append(f"  {i}. {move} ({centipawn/100:+.2f})")
-                else:
-                    analysis.append(f"  {i}. {move}")
+            lines.append("\nBest moves:")
+            lines.extend(_fmt_move(i, move_info) for i, move_info in enumerate(top_moves, 1))
         
-        return "\n".join(analysis)
+        return "\n".join(lines)
     
     def export_pgn(self) -> str:
         """Export the game in PGN format."""
@@ -314,11 +307,9 @@ class ChessEngine:
             node = node.add_variation(move)
             temp_board.push(move)
         
-        if self.is_game_over():
-            if self.board.is_checkmate():
-                game.headers["Result"] = "0-1" if self.board.turn else "1-0"
-            else:
-                game.headers["Result"] = "1/2-1/2"
+        outcome = self.board.outcome()
+        if outcome:
+            game.headers["Result"] = outcome.result()
         
         exporter = io.StringIO()
         exporter.write(str(game))
@@ -334,117 +325,120 @@ def main():
     
     engine = ChessEngine(skill_level=20, depth=20, think_time=2.0)
     
-    print("\nCommands:")
-    print("  [move]  - Make a move (e.g., 'e4', 'e2e4', 'Nf3')")
-    print("  'hint'  - Get a hint for the best move")
-    print("  'eval'  - Analyze current position")
-    print("  'undo'  - Undo last move (undoes 2 to skip engine move)")
-    print("  'level [0-20]' - Set difficulty (20 = hardest)")
-    print("  'moves' - Show all legal moves")
-    print("  'pgn'   - Export game in PGN format")
-    print("  'reset' - Start a new game")
-    print("  'quit'  - Exit the program")
-    print()
-    
-    engine.display_board()
-    
-    player_color = input("Play as (w)hite or (b)lack? [w]: ").strip().lower()
-    player_is_white = player_color != 'b'
-    
-    if not player_is_white:
-        print("\nEngine is playing as White...")
-        move = engine.engine_move()
-        if move:
-            print(f"Engine plays: {move}")
-        engine.display_board()
-    
-    while True:
-        if engine.is_game_over():
-            print("\n" + "=" * 50)
-            print(engine.get_game_result())
-            print("=" * 50)
-            print("\nGame over! Type 'reset' to play again or 'quit' to exit.")
-        
-        try:
-            cmd = input("\nYour move: ").strip()
-        except (EOFError, KeyboardInterrupt):
-            print("\nGoodbye!")
-            break
-        
-        if not cmd:
-            continue
-        
-        cmd_lower = cmd.lower()
-        
-        if cmd_lower == 'quit' or cmd_lower == 'exit':
-            print("Thanks for playing!")
-            break
-        
-        elif cmd_lower == 'reset':
-            engine.reset()
-            engine.display_board()
-            player_color = input("Play as (w)hite or (b)lack? [w]: ").strip().lower()
-            player_is_white = player_color != 'b'
-            if not player_is_white:
-                print("\nEngine is playing as White...")
-                move = engine.engine_move()
-                if move:
-                    print(f"Engine plays: {move}")
-                engine.display_board()
-            continue
+    try:
+        print("\nCommands:")
+        print("  [move]  - Make a move (e.g., 'e4', 'e2e4', 'Nf3')")
+        print("  'hint'  - Get a hint for the best move")
+        print("  'eval'  - Analyze current position")
+        print("  'undo'  - Undo last move (undoes 2 to skip engine move)")
+        print("  'level [0-20]' - Set difficulty (20 = hardest)")
+        print("  'moves' - Show all legal moves")
+        print("  'pgn'   - Export game in PGN format")
+        print("  'reset' - Start a new game")
+        print("  'quit'  - Exit the program")
+        print()
         
-        elif cmd_lower == 'hint':
-            best = engine.get_best_move()
-            if best:
-                print(f"Hint: Consider playing {best}")
-            continue
+        engine.display_board()
         
-        elif cmd_lower == 'eval':
-            print(engine.analyze_position())
-            continue
+        player_color = input("Play as (w)hite or (b)lack? [w]: ").strip().lower()
+        player_is_white = player_color != 'b'
         
-        elif cmd_lower == 'undo':
-            # Undo player's move and engine's response
-            engine.undo_move()
-            engine.undo_move()
+        if not player_is_white:
+            print("\nEngine is playing as White...")
+            move = engine.engine_move()
+            if move:
+                print(f"Engine plays: {move}")
             engine.display_board()
-            continue
-        
-        elif cmd_lower.startswith('level'):
-            parts = cmd_lower.split()
-            if len(parts) == 2:
-                try:
-                    level = int(parts[1])
-                    engine.set_difficulty(level)
-                except ValueError:
-                    print("Usage: level [0-20]")
-            else:
-                print(f"Current level: {engine.skill_level}/20")
-            continue
         
-        elif cmd_lower == 'moves':
-            moves = engine.get_legal_moves()
-            print(f"Legal moves ({len(moves)}): {', '.join(moves)}")
-            continue
-        
-        elif cmd_lower == 'pgn':
-            print("\n" + engine.export_pgn())
-            continue
-        
-        # Try to make the move
-        if engine.is_game_over():
-            print("Game is over. Type 'reset' to start a new game.")
-            continue
-        
-        if engine.make_move(cmd):
-            engine.display_board()
+        while True:
+            if engine.is_game_over():
+                print("\n" + "=" * 50)
+                print(engine.get_game_result())
+                print("=" * 50)
+                print("\nGame over! Type 'reset' to play again or 'quit' to exit.")
             
-            if not engine.is_game_over():
-                print("Engine is thinking...")
-                engine_move = engine.engine_move()
-                if engine_move:
-                    print(f"Engine plays: {engine_move}")
+            try:
+                cmd = input("\nYour move: ").strip()
+            except (EOFError, KeyboardInterrupt):
+                print("\nGoodbye!")
+                break
+            
+            if not cmd:
+                continue
+            
+            cmd_lower = cmd.lower()
+            
+            if cmd_lower == 'quit' or cmd_lower == 'exit':
+                print("Thanks for playing!")
+                break
+            
+            elif cmd_lower == 'reset':
+                engine.reset()
+                engine.display_board()
+                player_color = input("Play as (w)hite or (b)lack? [w]: ").strip().lower()
+                player_is_white = player_color != 'b'
+                if not player_is_white:
+                    print("\nEngine is playing as White...")
+                    move = engine.engine_move()
+                    if move:
+                        print(f"Engine plays: {move}")
+                    engine.display_board()
+                continue
+            
+            elif cmd_lower == 'hint':
+                best = engine.get_best_move()
+                if best:
+                    print(f"Hint: Consider playing {best}")
+                continue
+            
+            elif cmd_lower == 'eval':
+                print(engine.analyze_position())
+                continue
+            
+            elif cmd_lower == 'undo':
+                # Undo player's move and engine's response
+                engine.undo_move()
+                engine.undo_move()
                 engine.display_board()
+                continue
+            
+            elif cmd_lower.startswith('level'):
+                parts = cmd_lower.split()
+                if len(parts) == 2:
+                    try:
+                        level = int(parts[1])
+                        engine.set_difficulty(level)
+                    except ValueError:
+                        print("Usage: level [0-20]")
+                else:
+                    print(f"Current level: {engine.skill_level}/20")
+                continue
+            
+            elif cmd_lower == 'moves':
+                moves = engine.get_legal_moves()
+                print(f"Legal moves ({len(moves)}): {', '.join(moves)}")
+                continue
+            
+            elif cmd_lower == 'pgn':
+                print("\n" + engine.export_pgn())
+                continue
+            
+            # Try to make the move
+            if engine.is_game_over():
+                print("Game is over. Type 'reset' to start a new game.")
+                continue
+            
+            if engine.make_move(cmd):
+                engine.display_board()
+                
+                if not engine.is_game_over():
+                    print("Engine is thinking...")
+                    engine_move = engine.engine_move()
+                    if engine_move:
+                        print(f"Engine plays: {engine_move}")
+                    engine.display_board()
+    finally:
+        engine.close()
 
 
 if __name__ == "__main__":
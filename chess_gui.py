@@ -4,9 +4,13 @@ A powerful chess engine with a visual board using tkinter.
 """
 
 import chess
+import chess.engine
 import os
+import queue
 import sys
 import threading
+import time
+from collections import OrderedDict
 from typing import Optional, Tuple, List
 
 try:
@@ -16,6 +20,19 @@ except ImportError:
     print("tkinter not available. Please run chess_engine.py for command-line version.")
     sys.exit(1)
 
+from game_outcome import TERMINATION_REASONS
+from stockfish_hash import hash_budget_mb
+from stockfish_locator import find_stockfish
+
+# Located once at import rather than for every engine instance
+STOCKFISH_PATH = find_stockfish()
+
+
+def _score_pair(score: chess.engine.PovScore) -> Tuple[Optional[int], Optional[int]]:
+    """(centipawns, mate in N) from White's side; one of the two is None."""
+    white = score.white()
+    return white.score(), white.mate()
+
 
 class ChessGUI:
     """Graphical chess interface using tkinter."""
@@ -26,6 +43,17 @@ class ChessGUI:
     MOVE_HINT = "#829769"
     CHECK_COLOR = "#FF6B6B"
     
+    # Search depth for the evaluation shown on the player's turn
+    EVAL_DEPTH = 12
+    # Hints stop at this depth or at a think time that grows with skill level
+    HINT_DEPTH = 12
+    # Think time for the Analyze button's MultiPV search, in seconds
+    ANALYSIS_TIME = 1.5
+    # Transposition table size, reduced when memory is short
+    ENGINE_HASH_MB = 512
+    # Most hint/analysis/evaluation results remembered by position
+    RESULT_CACHE_SIZE = 4096
+    
     # Unicode chess pieces
     PIECES = {
         'K': '♔', 'Q': '♕', 'R': '♖', 'B': '♗', 'N': '♘', 'P': '♙',
@@ -48,19 +76,45 @@ class ChessGUI:
         self.is_fullscreen = False
         
         self.board = chess.Board()
+        self._legal_cache: Optional[frozenset] = None  # legal moves, cleared on push/pop
+        self._position_id = 0  # bumped whenever the position changes
+        self._epd_cache: Tuple[int, str] = (-1, "")  # (position id, EPD)
+        self._san_lines: List[str] = []  # move history, one line per full move
+        self._history_shown: List[str] = []  # lines currently in the history widget
+        # SAN is worked out on a background thread that mirrors the board.
+        # Each ply remembers the id of the push that made it so late results
+        # for undone moves are ignored.
+        self._san_jobs: queue.Queue = queue.Queue()
+        self._push_id = 0
+        self._ply_ids: List[int] = []
+        self._san_done = 0  # plies already written into _san_lines
+        threading.Thread(target=self._san_worker, daemon=True).start()
         self.selected_square = None
         self.valid_moves = []
         self.player_color = chess.WHITE
         self.engine_thinking = False
-        self.stockfish = None
+        self._engine_move_id = -1  # position the latest engine move was requested for
+        self.engine: Optional[chess.engine.SimpleEngine] = None
+        self._jobs: queue.Queue = queue.Queue()  # searches for the engine worker thread
+        self._engine_busy = False  # a hint or analysis is waiting on the worker
+        # Passed to every search as its game; only a change makes python-chess
+        # send ucinewgame, so the hash survives from move to move
+        self._game_epoch = 0
+        self._result_cache: OrderedDict = OrderedDict()
         self.skill_level = 20
+        self._skill_after_id: Optional[str] = None
         self.think_time = 2.0
+        # Leave one core for the GUI and the rest of the desktop
+        self.engine_threads = max(1, (os.cpu_count() or 2) - 1)
+        self.engine_hash_mb = min(self.ENGINE_HASH_MB, hash_budget_mb())
 
         # Match options - time-based
         self.time_control_var = tk.StringVar(value="no_limit")
         self.white_time_ms: Optional[int] = None
         self.black_time_ms: Optional[int] = None
         self.clock_job_id: Optional[str] = None
+        self._clock_side: Optional[bool] = None  # side whose clock is running
+        self._clock_started = 0.0  # monotonic time the running clock was last charged
         self.game_in_progress = False
 
         # Time presets (in minutes)
@@ -77,60 +131,148 @@ class ChessGUI:
         self.max_hints_per_game = 5
         self.hints_used = 0
         
-        self._init_stockfish()
+        # Pending UI refreshes, applied together on the next idle callback
+        self._ui_dirty: set = set()
+        self._flush_scheduled = False
+        self._status_text = ""
+        self._label_texts = {}  # last text set on each frequently updated label
+        self._white_clock_text = "∞"
+        self._time_texts = {}  # whole seconds -> "M:SS"
+        self._black_clock_text = "∞"
+        
+        self._init_engine()
         self._create_widgets()
+        self._build_board()
         self._draw_board()
         
         # Keyboard bindings
         self.root.bind("<F11>", lambda e: self._toggle_fullscreen())
         self.root.bind("<Escape>", lambda e: self._exit_fullscreen())
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
     
-    def _init_stockfish(self):
-        """Initialize Stockfish engine."""
+    def _init_engine(self):
+        """Start one Stockfish process that lives as long as the window.
+        
+        Searches are given the board itself, so Stockfish receives the game's
+        moves rather than a fresh FEN and keeps its hash table between moves.
+        """
         try:
-            from stockfish import Stockfish
-            
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            stockfish_paths = [
-                os.path.join(script_dir, "stockfish.exe"),
-                "stockfish.exe",
-                "stockfish",
-                r"C:\stockfish\stockfish.exe",
-            ]
-            
-            for path in stockfish_paths:
-                try:
-                    if os.path.exists(path):
-                        self.stockfish = Stockfish(
-                            path=path,
-                            depth=20,
-                            parameters={
-                                "Skill Level": self.skill_level,
-                                "Threads": 4,
-                                "Hash": 256,
-                            }
-                        )
-                        print(f"Stockfish loaded from {path}")
-                        return
-                except Exception as e:
-                    continue
-            
-            # Try system PATH
-            import shutil
-            if shutil.which("stockfish"):
-                self.stockfish = Stockfish(
-                    depth=20,
-                    parameters={
-                        "Skill Level": self.skill_level,
-                        "Threads": 4,
-                        "Hash": 256,
-                    }
-                )
-                print("Stockfish loaded from system PATH")
+            if STOCKFISH_PATH:
+                self.engine = chess.engine.SimpleEngine.popen_uci(STOCKFISH_PATH)
+                self.engine.configure({
+                    "Skill Level": self.skill_level,
+                    "Threads": self.engine_threads,
+                    "Hash": self.engine_hash_mb,
+                    "UCI_LimitStrength": False,
+                })
+                print(f"Stockfish loaded from {STOCKFISH_PATH}")
+                threading.Thread(target=self._engine_worker, daemon=True).start()
+                self._warm_engine()
                 
         except Exception as e:
             print(f"Stockfish not available: {e}")
             print("Please run download_stockfish.py first")
+            self.engine = None
+    
+    def _engine_worker(self):
+        """Run queued engine searches one at a time, off the Tk thread.
+        
+        Results are handed back with root.after(); the worker never touches
+        a widget itself.
+        """
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            if job[0] == "configure":
+                # Run between searches: configuring the engine mid-search
+                # would cancel whatever it is working on
+                try:
+                    self.engine.configure(job[1])
+                except Exception as e:
+                    self.root.after(0, self._show_engine_error, "Engine Settings", e)
+                continue
+            kind, board, limit, position_id, cache_key, callback = job
+            if kind == "bestmove":
+                try:
+                    # Stream the search so its scores double as the evaluation.
+                    # Below full strength Stockfish searches several lines at
+                    # once; only the best one is the position's score
+                    with self.engine.analysis(board, limit, game=self._game_epoch) as analysis:
+                        for info in analysis:
+                            if "score" in info and "pv" in info and info.get("multipv", 1) == 1:
+                                self.root.after(0, self._show_evaluation, position_id, *_score_pair(info["score"]))
+                        result = analysis.wait()
+                    if result.move:
+                        self.root.after(0, self._apply_engine_move, position_id, result.move.uci())
+                    else:
+                        self.root.after(0, self._engine_failed, "Engine returned no move")
+                except Exception as e:
+                    self.root.after(0, self._engine_failed, f"Engine error: {e}")
+            elif kind == "warm":
+                try:
+                    self.engine.analyse(board, limit, game=self._game_epoch)
+                except Exception:
+                    pass
+            else:
+                # eval, hint and analysis results go back to their caller
+                try:
+                    value, error = self._search(kind, board, limit), None
+                except Exception as e:
+                    value, error = None, e
+                self.root.after(0, self._finish_job, cache_key, callback, value, error)
+    
+    def _search(self, kind: str, board: chess.Board, limit: chess.engine.Limit):
+        """Run an eval, hint or analysis search on the worker thread."""
+        if kind == "eval":
+            info = self.engine.analyse(board, limit, game=self._game_epoch)
+            return list(_score_pair(info["score"]))
+        if kind == "hint":
+            result = self.engine.play(board, limit, game=self._game_epoch)
+            return result.move.uci() if result.move else None
+        # One MultiPV search gives both the evaluation and the top moves
+        return [
+            [info["pv"][0].uci() if info.get("pv") else "?", *_score_pair(info["score"])]
+            for info in self.engine.analyse(board, limit, multipv=5, game=self._game_epoch)
+            if "score" in info
+        ]
+    
+    def _submit(self, kind: str, limit: chess.engine.Limit, cache_key: str, callback):
+        """Queue a search of the current position.
+        
+        callback(value, error) runs on the Tk thread once the search finishes.
+        """
+        self._jobs.put((kind, self.board.copy(), limit, self._position_id, cache_key, callback))
+    
+    def _finish_job(self, cache_key: str, callback, value, error: Optional[Exception]):
+        """Cache a finished search and hand it to the caller that asked for it."""
+        if error is None and value is not None:
+            self._cache_put(cache_key, value)
+        callback(value, error)
+    
+    def _configure_engine(self, options: dict):
+        """Queue engine option changes behind any searches already waiting."""
+        self._jobs.put(("configure", options))
+    
+    def _warm_engine(self):
+        """Queue a throwaway depth-1 search.
+        
+        The first search after startup or ucinewgame pays for loading the
+        network and allocating the hash; doing it now keeps that delay off
+        the player's first move or hint.
+        """
+        self._jobs.put(("warm", chess.Board(), chess.engine.Limit(depth=1), self._position_id, None, None))
+    
+    def _on_close(self):
+        """Shut the engine down with the window so its process does not linger."""
+        self._jobs.put(None)
+        self._san_jobs.put(None)
+        if self.engine:
+            try:
+                self.engine.quit()
+            except Exception:
+                pass
+        self.root.destroy()
     
     def _create_widgets(self):
         """Create GUI widgets with modern, web-like design."""
@@ -145,6 +287,42 @@ class ChessGUI:
         
         self.root.config(bg=BG_DARK)
         
+        # Shared looks for the control panel, configured once per style
+        # instead of per widget
+        style = ttk.Style(self.root)
+        style.theme_use("clam")
+        style.configure(
+            "Accent.TButton",
+            font=("Segoe UI", 9, "bold"),
+            background=ACCENT_BLUE,
+            foreground=TEXT_PRIMARY,
+            borderwidth=0,
+            padding=(8, 6),
+        )
+        style.map(
+            "Accent.TButton",
+            background=[("active", "#0052cc")],
+            foreground=[("active", TEXT_PRIMARY)],
+        )
+        style.configure(
+            "Panel.TRadiobutton",
+            font=("Segoe UI", 9),
+            background=BG_LIGHT,
+            foreground=TEXT_PRIMARY,
+            indicatorbackground=BG_MEDIUM,
+        )
+        style.map(
+            "Panel.TRadiobutton",
+            background=[("active", BG_LIGHT)],
+            foreground=[("active", ACCENT_BLUE)],
+        )
+        style.configure(
+            "Section.TLabel",
+            font=("Segoe UI", 10, "bold"),
+            background=BG_LIGHT,
+            foreground=TEXT_PRIMARY,
+        )
+        
         # Main container with padding
         main_frame = tk.Frame(self.root, bg=BG_DARK)
         main_frame.pack(padx=16, pady=16, fill=tk.BOTH, expand=True)
@@ -174,9 +352,10 @@ class ChessGUI:
         white_frame = tk.Frame(clocks_container, bg=BG_LIGHT)
         white_frame.pack(side=tk.LEFT, padx=(0, 20))
         tk.Label(white_frame, text="White", font=("Segoe UI", 10, "bold"), bg=BG_LIGHT, fg=TEXT_PRIMARY).pack(anchor="w")
+        self._white_clock_var = tk.StringVar(value="∞")
         self.white_clock_label = tk.Label(
             white_frame,
-            text="∞",
+            textvariable=self._white_clock_var,
             font=("Segoe UI", 16, "bold"),
             bg=BG_LIGHT,
             fg=ACCENT_GREEN,
@@ -187,9 +366,10 @@ class ChessGUI:
         black_frame = tk.Frame(clocks_container, bg=BG_LIGHT)
         black_frame.pack(side=tk.LEFT)
         tk.Label(black_frame, text="Black", font=("Segoe UI", 10, "bold"), bg=BG_LIGHT, fg=TEXT_SECONDARY).pack(anchor="w")
+        self._black_clock_var = tk.StringVar(value="∞")
         self.black_clock_label = tk.Label(
             black_frame,
-            text="∞",
+            textvariable=self._black_clock_var,
             font=("Segoe UI", 16, "bold"),
             bg=BG_LIGHT,
             fg=TEXT_SECONDARY,
@@ -254,10 +434,36 @@ class ChessGUI:
         canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
         canvas.configure(yscrollcommand=scrollbar.set)
         
-        # Allow mouse wheel scrolling
+        # Allow mouse wheel scrolling while the pointer is over the panel
+        # (<MouseWheel> on Windows/macOS, buttons 4 and 5 on X11)
+        wheel_events = ("<MouseWheel>", "<Button-4>", "<Button-5>")
+        
         def _on_mousewheel(event):
-            canvas.yview_scroll(int(-1*(event.delta/120)), "units")
-        canvas.bind_all("<MouseWheel>", _on_mousewheel)
+            # The move history scrolls itself
+            if event.widget is self.history_text:
+                return
+            if event.num == 4:
+                step = -1
+            elif event.num == 5:
+                step = 1
+            else:
+                step = int(-1*(event.delta/120))
+            canvas.yview_scroll(step, "units")
+        
+        def _bind_wheel(event):
+            for sequence in wheel_events:
+                canvas.bind_all(sequence, _on_mousewheel)
+        
+        def _unbind_wheel(event):
+            # Leave also fires when the pointer moves onto a widget inside the panel
+            widget = canvas.winfo_containing(event.x_root, event.y_root)
+            if widget is not None and f"{widget}.".startswith(f"{canvas}."):
+                return
+            for sequence in wheel_events:
+                canvas.unbind_all(sequence)
+        
+        canvas.bind("<Enter>", _bind_wheel)
+        canvas.bind("<Leave>", _unbind_wheel)
         
         canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
@@ -266,13 +472,7 @@ class ChessGUI:
         time_ctrl_frame = tk.Frame(scrollable_frame, bg=BG_LIGHT, relief=tk.FLAT)
         time_ctrl_frame.pack(fill=tk.X, pady=(0, 8))
         
-        tk.Label(
-            time_ctrl_frame,
-            text="Time Control",
-            font=("Segoe UI", 10, "bold"),
-            bg=BG_LIGHT,
-            fg=TEXT_PRIMARY,
-        ).pack(anchor="w", padx=8, pady=(8, 4))
+        ttk.Label(time_ctrl_frame, text="Time Control", style="Section.TLabel").pack(anchor="w", padx=8, pady=(8, 4))
         
         time_choices_frame = tk.Frame(time_ctrl_frame, bg=BG_LIGHT)
         time_choices_frame.pack(fill=tk.X, padx=8, pady=(0, 8))
@@ -286,30 +486,19 @@ class ChessGUI:
             ("15 min", "15"),
         ]
         for text, value in choices:
-            tk.Radiobutton(
+            ttk.Radiobutton(
                 time_choices_frame,
                 text=text,
                 value=value,
                 variable=self.time_control_var,
-                bg=BG_LIGHT,
-                fg=TEXT_PRIMARY,
-                selectcolor=BG_MEDIUM,
-                activebackground=BG_LIGHT,
-                activeforeground=ACCENT_BLUE,
-                font=("Segoe UI", 9),
+                style="Panel.TRadiobutton",
             ).pack(side=tk.LEFT, padx=4, pady=2)
         
         # Difficulty and engine settings
         settings_frame = tk.Frame(scrollable_frame, bg=BG_LIGHT, relief=tk.FLAT)
         settings_frame.pack(fill=tk.X, pady=8)
         
-        tk.Label(
-            settings_frame,
-            text="Difficulty",
-            font=("Segoe UI", 10, "bold"),
-            bg=BG_LIGHT,
-            fg=TEXT_PRIMARY,
-        ).pack(anchor="w", padx=8, pady=(8, 4))
+        ttk.Label(settings_frame, text="Difficulty", style="Section.TLabel").pack(anchor="w", padx=8, pady=(8, 4))
         
         self.difficulty_var = tk.IntVar(value=20)
         self.difficulty_slider = tk.Scale(
@@ -341,51 +530,32 @@ class ChessGUI:
         time_frame.pack(fill=tk.X, padx=8, pady=(0, 8))
         
         for t in [0.5, 1, 2, 5]:
-            tk.Radiobutton(
-                time_frame, 
-                text=str(t), 
-                variable=self.time_var, 
+            ttk.Radiobutton(
+                time_frame,
+                text=str(t),
+                variable=self.time_var,
                 value=t,
-                bg=BG_LIGHT,
-                fg=TEXT_PRIMARY,
-                selectcolor=BG_MEDIUM,
-                activebackground=BG_LIGHT,
-                activeforeground=ACCENT_BLUE,
-                font=("Segoe UI", 9),
+                style="Panel.TRadiobutton",
             ).pack(side=tk.LEFT, padx=4)
         
         # Action buttons
         buttons_frame = tk.Frame(scrollable_frame, bg=BG_LIGHT, relief=tk.FLAT)
         buttons_frame.pack(fill=tk.X, pady=8)
         
-        tk.Label(
-            buttons_frame,
-            text="Actions",
-            font=("Segoe UI", 10, "bold"),
-            bg=BG_LIGHT,
-            fg=TEXT_PRIMARY,
-        ).pack(anchor="w", padx=8, pady=(8, 4))
+        ttk.Label(buttons_frame, text="Actions", style="Section.TLabel").pack(anchor="w", padx=8, pady=(8, 4))
         
         btn_container = tk.Frame(buttons_frame, bg=BG_LIGHT)
         btn_container.pack(fill=tk.BOTH, padx=8, pady=(0, 8))
         
-        btn_style = {
-            "font": ("Segoe UI", 9, "bold"),
-            "bg": ACCENT_BLUE,
-            "fg": TEXT_PRIMARY,
-            "activebackground": "#0052cc",
-            "activeforeground": TEXT_PRIMARY,
-            "border": 0,
-            "padx": 8,
-            "pady": 6,
-        }
-        
-        tk.Button(btn_container, text="New Game", command=self._new_game, **btn_style).pack(fill=tk.X, pady=3)
-        tk.Button(btn_container, text="Get Hint", command=self._get_hint, **btn_style).pack(fill=tk.X, pady=3)
-        tk.Button(btn_container, text="Analyze", command=self._analyze_position, **btn_style).pack(fill=tk.X, pady=3)
-        tk.Button(btn_container, text="Flip Board", command=self._flip_board, **btn_style).pack(fill=tk.X, pady=3)
-        tk.Button(btn_container, text="Undo Move", command=self._undo_move, **btn_style).pack(fill=tk.X, pady=3)
-        tk.Button(btn_container, text="Fullscreen (F11)", command=self._toggle_fullscreen, **btn_style).pack(fill=tk.X, pady=3)
+        ttk.Button(btn_container, text="New Game", command=self._new_game, style="Accent.TButton").pack(fill=tk.X, pady=3)
+        self.hint_button = ttk.Button(btn_container, text="Get Hint", command=self._get_hint, style="Accent.TButton")
+        self.hint_button.pack(fill=tk.X, pady=3)
+        self.analyze_button = ttk.Button(btn_container, text="Analyze", command=self._analyze_position, style="Accent.TButton")
+        self.analyze_button.pack(fill=tk.X, pady=3)
+        ttk.Button(btn_container, text="Flip Board", command=self._flip_board, style="Accent.TButton").pack(fill=tk.X, pady=3)
+        ttk.Button(btn_container, text="Undo Move", command=self._undo_move, style="Accent.TButton").pack(fill=tk.X, pady=3)
+        ttk.Button(btn_container, text="Engine Settings", command=self._engine_settings, style="Accent.TButton").pack(fill=tk.X, pady=3)
+        ttk.Button(btn_container, text="Fullscreen (F11)", command=self._toggle_fullscreen, style="Accent.TButton").pack(fill=tk.X, pady=3)
 
         # Hint usage info
         self.hint_label = tk.Label(
@@ -397,17 +567,30 @@ class ChessGUI:
         )
         self.hint_label.pack(anchor="w", padx=8, pady=(0, 8))
         
+        # Hints, analysis and timeouts land here instead of a modal dialog,
+        # which would hold up the Tk loop (and the clock) until dismissed
+        engine_output_frame = tk.Frame(scrollable_frame, bg=BG_LIGHT, relief=tk.FLAT)
+        engine_output_frame.pack(fill=tk.X, pady=8)
+        
+        ttk.Label(engine_output_frame, text="Engine Output", style="Section.TLabel").pack(anchor="w", padx=8, pady=(8, 4))
+        
+        self._analysis_var = tk.StringVar(value="")
+        tk.Label(
+            engine_output_frame,
+            textvariable=self._analysis_var,
+            font=("Consolas", 9),
+            bg=BG_MEDIUM,
+            fg=TEXT_PRIMARY,
+            justify=tk.LEFT,
+            anchor="nw",
+            wraplength=220,
+        ).pack(fill=tk.X, padx=8, pady=(0, 8))
+        
         # Move history section
         history_frame_outer = tk.Frame(scrollable_frame, bg=BG_LIGHT, relief=tk.FLAT)
         history_frame_outer.pack(fill=tk.BOTH, expand=True, pady=8)
         
-        tk.Label(
-            history_frame_outer,
-            text="Move History",
-            font=("Segoe UI", 10, "bold"),
-            bg=BG_LIGHT,
-            fg=TEXT_PRIMARY,
-        ).pack(anchor="w", padx=8, pady=(8, 4))
+        ttk.Label(history_frame_outer, text="Move History", style="Section.TLabel").pack(anchor="w", padx=8, pady=(8, 4))
         
         history_frame = tk.Frame(history_frame_outer, bg=BG_MEDIUM)
         history_frame.pack(fill=tk.BOTH, expand=True, padx=8, pady=(0, 8))
@@ -430,8 +613,8 @@ class ChessGUI:
         scrollbar.config(command=self.history_text.yview)
         
         # Engine status
-        engine_status = "Ready" if self.stockfish else "Not Available"
-        status_color = ACCENT_GREEN if self.stockfish else "#ff4444"
+        engine_status = "Ready" if self.engine else "Not Available"
+        status_color = ACCENT_GREEN if self.engine else "#ff4444"
         
         self.engine_label = tk.Label(
             scrollable_frame,
@@ -442,106 +625,134 @@ class ChessGUI:
         )
         self.engine_label.pack(pady=(4, 8))
     
-    def _draw_board(self):
-        """Draw the chess board."""
-        self.canvas.delete("all")
-        
-        # Check if king is in check
-        check_square = None
-        if self.board.is_check():
-            king_square = self.board.king(self.board.turn)
-            check_square = king_square
-        
-        # Draw squares
-        for row in range(8):
-            for col in range(8):
-                x1 = col * self.square_size
-                y1 = row * self.square_size
-                x2 = x1 + self.square_size
-                y2 = y1 + self.square_size
-                
-                # Calculate actual square index based on board orientation
-                if self.player_color == chess.WHITE:
-                    square = chess.square(col, 7 - row)
-                else:
-                    square = chess.square(7 - col, row)
-                
-                # Determine square color
-                light = (row + col) % 2 == 0
-                color = self.LIGHT_SQUARE if light else self.DARK_SQUARE
-                
-                # Highlight selected square
-                if square == self.selected_square:
-                    color = self.HIGHLIGHT
-                # Highlight valid move destinations
-                elif square in self.valid_moves:
-                    color = self.MOVE_HINT
-                # Highlight check
-                elif square == check_square:
-                    color = self.CHECK_COLOR
-                
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="")
-                
-                # Draw piece
-                piece = self.board.piece_at(square)
-                if piece:
-                    symbol = self.PIECES.get(piece.symbol(), "?")
-                    # Make white pieces bright and black pieces dark so they are
-                    # clearly distinguishable on both light and dark squares.
-                    if piece.color == chess.WHITE:
-                        # Slight shadow + white foreground for contrast
-                        self.canvas.create_text(
-                            x1 + self.square_size // 2 + 1,
-                            y1 + self.square_size // 2 + 1,
-                            text=symbol,
-                            font=("Arial", 42, "bold"),
-                            fill="#000000",
-                        )
-                        self.canvas.create_text(
-                            x1 + self.square_size // 2,
-                            y1 + self.square_size // 2,
-                            text=symbol,
-                            font=("Arial", 42, "bold"),
-                            fill="#FFFFFF",
-                        )
-                    else:
-                        # Solid black pieces with a light outline
-                        self.canvas.create_text(
-                            x1 + self.square_size // 2 + 1,
-                            y1 + self.square_size // 2 + 1,
-                            text=symbol,
-                            font=("Arial", 42, "bold"),
-                            fill="#FFFFFF",
-                        )
-                        self.canvas.create_text(
-                            x1 + self.square_size // 2,
-                            y1 + self.square_size // 2,
-                            text=symbol,
-                            font=("Arial", 42, "bold"),
-                            fill="#000000",
-                        )
-        
-        # Draw coordinates
-        for i in range(8):
-            # Files (a-h)
-            file_label = chr(ord('a') + i) if self.player_color == chess.WHITE else chr(ord('h') - i)
-            self.canvas.create_text(
-                i * self.square_size + self.square_size // 2,
-                8 * self.square_size - 8,
-                text=file_label,
-                font=("Arial", 10),
-                fill="#666"
+    def _build_board(self):
+        """Create every board canvas item once; redraws only reconfigure them."""
+        size = self.square_size
+        half = size // 2
+        piece_font = ("Arial", 42, "bold")
+        
+        # Item ids are indexed by display cell (row * 8 + col), not by square,
+        # so flipping the board only changes which square each cell shows
+        self._square_ids = []
+        self._body_ids = []
+        self._piece_ids = []
+        for cell in range(64):
+            row, col = divmod(cell, 8)
+            x1 = col * size
+            y1 = row * size
+            self._square_ids.append(
+                self.canvas.create_rectangle(x1, y1, x1 + size, y1 + size, outline="")
             )
-            
-            # Ranks (1-8)
-            rank_label = str(8 - i) if self.player_color == chess.WHITE else str(i + 1)
-            self.canvas.create_text(
-                8,
-                i * self.square_size + self.square_size // 2,
-                text=rank_label,
-                font=("Arial", 10),
-                fill="#666"
+            # White pieces are a white solid glyph under the dark outlined one,
+            # so they read as white with an outline on both square colours;
+            # black pieces only use the dark glyph and leave the body empty
+            self._body_ids.append(
+                self.canvas.create_text(x1 + half, y1 + half, font=piece_font, fill="#FFFFFF")
+            )
+            self._piece_ids.append(
+                self.canvas.create_text(x1 + half, y1 + half, font=piece_font, fill="#000000")
             )
+        
+        # Coordinates (files along the bottom, ranks down the left edge)
+        self._file_label_ids = [
+            self.canvas.create_text(i * size + half, 8 * size - 8, font=("Arial", 10), fill="#666")
+            for i in range(8)
+        ]
+        self._rank_label_ids = [
+            self.canvas.create_text(8, i * size + half, font=("Arial", 10), fill="#666")
+            for i in range(8)
+        ]
+        
+        # Square shown at each display cell (row, col) for either orientation,
+        # the display cell of each square, and each square's base colour
+        self._sq_maps = {
+            chess.WHITE: tuple(tuple(chess.square(c, 7 - r) for c in range(8)) for r in range(8)),
+            chess.BLACK: tuple(tuple(chess.square(7 - c, r) for c in range(8)) for r in range(8)),
+        }
+        self._cell_maps = {}
+        for color, rows in self._sq_maps.items():
+            cells = [0] * 64
+            for row, squares in enumerate(rows):
+                for col, square in enumerate(squares):
+                    cells[square] = row * 8 + col
+            self._cell_maps[color] = tuple(cells)
+        self._square_colors = tuple(
+            self.LIGHT_SQUARE if chess.BB_LIGHT_SQUARES & bb else self.DARK_SQUARE
+            for bb in chess.BB_SQUARES
+        )
+        
+        # What the canvas currently shows, so redraws only visit squares
+        # whose piece or highlight changed
+        self._drawn_pieces = None  # per colour and piece type bitboards
+        self._drawn_marks = {}  # highlighted square -> colour
+        self._drawn_orientation = None
+    
+    def _draw_board(self):
+        """Bring the board items up to date, touching only squares that changed."""
+        board = self.board
+        
+        # Highlights, later entries taking precedence: check, move targets, selection
+        marks = {}
+        if board.is_check():
+            marks[board.king(board.turn)] = self.CHECK_COLOR
+        for square in self.valid_moves:
+            marks[square] = self.MOVE_HINT
+        if self.selected_square is not None:
+            marks[self.selected_square] = self.HIGHLIGHT
+        
+        pieces = tuple(
+            board.pieces_mask(piece_type, color)
+            for color in chess.COLORS for piece_type in chess.PIECE_TYPES
+        )
+        white_view = self.player_color == chess.WHITE
+        
+        if self.player_color != self._drawn_orientation:
+            # Flipped (or first draw): every cell shows a different square
+            self._drawn_orientation = self.player_color
+            moved = dirty = chess.BB_ALL
+            for i in range(8):
+                file_label = chr(ord('a') + i) if white_view else chr(ord('h') - i)
+                rank_label = str(8 - i) if white_view else str(i + 1)
+                self.canvas.itemconfig(self._file_label_ids[i], text=file_label)
+                self.canvas.itemconfig(self._rank_label_ids[i], text=rank_label)
+        else:
+            # Squares whose occupant changed, found by XOR-ing the bitboards
+            moved = 0
+            for old, new in zip(self._drawn_pieces, pieces):
+                moved |= old ^ new
+            dirty = moved
+            for square in marks.keys() | self._drawn_marks.keys():
+                if marks.get(square) != self._drawn_marks.get(square):
+                    dirty |= chess.BB_SQUARES[square]
+        self._drawn_pieces = pieces
+        self._drawn_marks = marks
+        
+        # Locals for the loop below, which may visit all 64 squares
+        itemconfig = self.canvas.itemconfig
+        cells = self._cell_maps[self.player_color]
+        square_colors = self._square_colors
+        square_ids = self._square_ids
+        body_ids = self._body_ids
+        piece_ids = self._piece_ids
+        bb_squares = chess.BB_SQUARES
+        piece_at = board.piece_at
+        PIECES = self.PIECES
+        
+        for square in chess.scan_forward(dirty):
+            cell = cells[square]
+            itemconfig(square_ids[cell], fill=marks.get(square) or square_colors[square])
+            if not moved & bb_squares[square]:
+                continue
+            
+            piece = piece_at(square)
+            if piece is None:
+                itemconfig(body_ids[cell], text="")
+                itemconfig(piece_ids[cell], text="")
+                continue
+            symbol = piece.symbol()
+            # The black symbols are the solid shapes, used as the white body
+            itemconfig(body_ids[cell], text=PIECES[symbol.lower()] if piece.color else "")
+            itemconfig(piece_ids[cell], text=PIECES[symbol])
     
     def _on_click(self, event):
         """Handle board click."""
@@ -557,11 +768,10 @@ class ChessGUI:
         
         col = event.x // self.square_size
         row = event.y // self.square_size
+        if not (0 <= row < 8 and 0 <= col < 8):
+            return
         
-        if self.player_color == chess.WHITE:
-            square = chess.square(col, 7 - row)
-        else:
-            square = chess.square(7 - col, row)
+        square = self._sq_maps[self.player_color][row][col]
         
         piece = self.board.piece_at(square)
         
@@ -570,7 +780,7 @@ class ChessGUI:
             if piece and piece.color == self.board.turn:
                 self.selected_square = square
                 self.valid_moves = [
-                    move.to_square for move in self.board.legal_moves 
+                    move.to_square for move in self._legal_moves()
                     if move.from_square == square
                 ]
         else:
@@ -585,7 +795,7 @@ class ChessGUI:
             self.selected_square = None
             self.valid_moves = []
         
-        self._draw_board()
+        self._mark_dirty("board")
     
     def _make_move(self, from_sq, to_sq) -> Optional[chess.Move]:
         """Make a move, handling promotion if needed."""
@@ -597,62 +807,137 @@ class ChessGUI:
                (piece.color == chess.BLACK and to_rank == 0):
                 # Always promote to queen for simplicity
                 move = chess.Move(from_sq, to_sq, promotion=chess.QUEEN)
-                if move in self.board.legal_moves:
-                    self.board.push(move)
+                if move in self._legal_moves():
+                    self._do_push(move)
                     return move
         
         move = chess.Move(from_sq, to_sq)
-        if move in self.board.legal_moves:
-            self.board.push(move)
+        if move in self._legal_moves():
+            self._do_push(move)
             return move
         
         return None
     
+    def _legal_moves(self) -> frozenset:
+        """Legal moves in the current position, generated once per position."""
+        if self._legal_cache is None:
+            self._legal_cache = frozenset(self.board.legal_moves)
+        return self._legal_cache
+    
+    def _do_push(self, move: chess.Move):
+        """Play a move and queue its SAN for the history."""
+        self._push_id += 1
+        self._ply_ids.append(self._push_id)
+        self._san_jobs.put(("push", self._push_id, move))
+        self.board.push(move)
+        self._legal_cache = None
+        self._position_id += 1
+    
+    def _do_pop(self):
+        """Take back the last move and drop it from the history."""
+        self.board.pop()
+        self._legal_cache = None
+        self._position_id += 1
+        self._san_jobs.put(("pop",))
+        self._ply_ids.pop()
+        if self._san_done <= len(self._ply_ids):
+            return
+        
+        self._san_done -= 1
+        if self.board.turn == chess.WHITE:
+            self._san_lines.pop()
+        else:
+            rest = self._san_lines[-1].rsplit(" ", 1)[0]
+            if rest.endswith("..."):
+                self._san_lines.pop()
+            else:
+                self._san_lines[-1] = rest
+    
+    def _reset_history(self):
+        """Forget the move history after self.board has been replaced."""
+        self._position_id += 1
+        self._san_lines = []
+        self._ply_ids = []
+        self._san_done = 0
+        self._san_jobs.put(("reset", self.board.copy()))
+    
+    def _san_worker(self):
+        """Work out SAN for queued moves on a board kept in step with the game."""
+        board = chess.Board()
+        while True:
+            job = self._san_jobs.get()
+            if job is None:
+                return
+            if job[0] == "push":
+                _, push_id, move = job
+                ply, fullmove, turn = len(board.move_stack), board.fullmove_number, board.turn
+                san = board.san_and_push(move)
+                self.root.after(0, self._record_san, push_id, ply, fullmove, turn, san)
+            elif job[0] == "pop":
+                board.pop()
+            else:
+                board = job[1]
+    
+    def _record_san(self, push_id: int, ply: int, fullmove: int, turn: bool, san: str):
+        """Add a move's SAN to the history unless the move was taken back meanwhile."""
+        if ply >= len(self._ply_ids) or self._ply_ids[ply] != push_id:
+            return
+        
+        # The worker answers in push order, so a live result is always the next ply
+        if turn == chess.WHITE:
+            self._san_lines.append(f"{fullmove}. {san}")
+        elif self._san_lines:
+            self._san_lines[-1] += f" {san}"
+        else:
+            self._san_lines.append(f"{fullmove}... {san}")
+        self._san_done += 1
+        self._mark_dirty("history")
+    
     def _engine_move(self):
         """Make the engine play a move."""
-        if not self.stockfish:
+        if not self.engine:
             self._update_status("Engine not available!")
             return
         
         self.engine_thinking = True
         self._update_status("Engine thinking...")
         
-        def think():
-            try:
-                self.stockfish.set_fen_position(self.board.fen())
-                think_time_ms = int(self.time_var.get() * 1000)
-                best_move = self.stockfish.get_best_move_time(think_time_ms)
-                
-                if best_move:
-                    self.root.after(0, lambda: self._apply_engine_move(best_move))
-            except Exception as e:
-                print(f"Engine error: {e}")
-                self.root.after(0, lambda: self._update_status("Engine error!"))
-            finally:
+        limit = chess.engine.Limit(time=self.time_var.get())
+        self._engine_move_id = self._position_id
+        self._jobs.put(("bestmove", self.board.copy(), limit, self._position_id, None, None))
+    
+    def _engine_failed(self, message: str):
+        """Report a failed engine search and hand the board back to the player."""
+        print(message)
+        self.engine_thinking = False
+        self._update_status("Engine error!")
+    
+    def _apply_engine_move(self, position_id: int, move_uci: str):
+        """Apply the engine's move to the board if it was searched on this position."""
+        if position_id != self._position_id:
+            # Undo or New Game changed the board while the engine was thinking;
+            # only the latest request decides whether it is still thinking
+            if position_id == self._engine_move_id:
                 self.engine_thinking = False
+            return
         
-        thread = threading.Thread(target=think)
-        thread.daemon = True
-        thread.start()
-    
-    def _apply_engine_move(self, move_uci: str):
-        """Apply the engine's move to the board."""
         try:
             move = chess.Move.from_uci(move_uci)
-            if move in self.board.legal_moves:
-                self.board.push(move)
+            if move in self._legal_moves():
+                self._do_push(move)
                 self._update_after_move()
         except Exception as e:
             print(f"Error applying move: {e}")
         
         self.engine_thinking = False
-        self._draw_board()
+        self._mark_dirty("board")
     
     def _update_after_move(self):
         """Update GUI after a move."""
-        self._draw_board()
-        self._update_history()
-        self._update_evaluation()
+        self._mark_dirty("board", "history")
+        # On the engine's turn its own search reports the evaluation
+        if self.board.turn == self.player_color or self.board.is_game_over():
+            self._mark_dirty("eval")
         self._start_clock_for_current_player()
         
         if self.board.is_game_over():
@@ -664,75 +949,107 @@ class ChessGUI:
             else:
                 self._update_status(f"Engine's turn - {turn}")
     
+    def _mark_dirty(self, *parts: str):
+        """Queue parts of the UI for refresh on the next idle callback."""
+        self._ui_dirty.update(parts)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self.root.after_idle(self._flush_ui)
+    
+    def _flush_ui(self):
+        """Apply every queued refresh once, however many times it was requested."""
+        dirty, self._ui_dirty = self._ui_dirty, set()
+        self._flush_scheduled = False
+        
+        if "board" in dirty:
+            self._draw_board()
+        if "history" in dirty:
+            self._update_history()
+        if "status" in dirty:
+            self._set_label_text(self.status_label, self._status_text)
+        if "clocks" in dirty:
+            self._update_clocks()
+        if "eval" in dirty:
+            self._update_evaluation()
+    
+    def _set_label_text(self, label: tk.Label, text: str):
+        """Set a label's text, skipping the Tk call when it would not change."""
+        if self._label_texts.get(label) != text:
+            label.config(text=text)
+            self._label_texts[label] = text
+    
     def _update_status(self, text: str):
         """Update the status label."""
-        self.status_label.config(text=text)
-        self.root.update_idletasks()
+        self._status_text = text
+        self._mark_dirty("status")
     
     def _update_history(self):
         """Update move history display."""
-        self.history_text.delete(1.0, tk.END)
-        moves = list(self.board.move_stack)
-
-        # Use a fresh temporary board to generate SAN that is always
-        # consistent with the move sequence so we never call san() on
-        # an illegal move in the current position.
-        temp_board = chess.Board()
-        line_parts = []
-
-        for idx, move in enumerate(moves):
-            try:
-                san = temp_board.san(move)
-            except Exception:
-                # Fallback: if something goes wrong, just use UCI
-                san = move.uci()
-
-            move_number = idx // 2 + 1
-            if idx % 2 == 0:
-                # White move – start a new line
-                line_parts.append(f"{move_number}. {san}")
-            else:
-                # Black move – append to current line
-                line_parts[-1] += f" {san}"
-
-            temp_board.push(move)
-
-        history_text = "\n".join(line_parts) + ("\n" if line_parts else "")
-        self.history_text.insert(tk.END, history_text)
+        lines, shown = self._san_lines, self._history_shown
+        
+        # Only the tail changes between calls, so keep the lines that still match
+        keep = min(len(shown), len(lines))
+        while keep and shown[keep - 1] != lines[keep - 1]:
+            keep -= 1
+        if keep == len(shown) == len(lines):
+            return
         
-        self.history_text.see(tk.END)
+        # Follow new moves only if the view was already at the bottom, so
+        # scrolling back through a long game is not undone by each move
+        at_bottom = self.history_text.yview()[1] >= 0.98
+        
+        self.history_text.delete(f"{keep + 1}.0", tk.END)
+        if keep < len(lines):
+            self.history_text.insert(tk.END, "\n".join(lines[keep:]) + "\n")
+        del shown[keep:]
+        shown.extend(lines[keep:])
+        
+        if at_bottom:
+            self.history_text.see(tk.END)
     
     def _update_evaluation(self):
-        """Update position evaluation."""
-        if not self.stockfish:
+        """Queue a quick evaluation of the current position."""
+        if not self.engine:
             return
         
-        try:
-            self.stockfish.set_fen_position(self.board.fen())
-            evaluation = self.stockfish.get_evaluation()
-            
-            if evaluation["type"] == "cp":
-                score = evaluation["value"] / 100
-                self.eval_label.config(text=f"Evaluation: {score:+.2f}")
-            elif evaluation["type"] == "mate":
-                self.eval_label.config(text=f"Mate in {evaluation['value']}")
-        except Exception:
-            pass
+        # A shallow search is plenty for the label and keeps the engine free
+        limit = chess.engine.Limit(depth=self.EVAL_DEPTH)
+        key = self._cache_key("eval", limit)
+        cached = self._cache_get(key)
+        if cached is not None:
+            self._show_evaluation(self._position_id, *cached)
+            return
+        
+        position_id = self._position_id
+        
+        def done(value, error):
+            if error is None:
+                self._show_evaluation(position_id, *value)
+        
+        self._submit("eval", limit, key, done)
+    
+    def _show_evaluation(self, position_id: int, cp: Optional[int], mate: Optional[int]):
+        """Show an engine score (from White's side) if its position is still on the board."""
+        if position_id != self._position_id:
+            return
+        
+        if mate is not None:
+            self._set_label_text(self.eval_label, f"Mate in {mate}")
+        else:
+            self._set_label_text(self.eval_label, f"Evaluation: {cp / 100:+.2f}")
     
     def _show_game_over(self):
         """Show game over message."""
         self.game_in_progress = False
         self._stop_clock()
         
-        if self.board.is_checkmate():
-            winner = "Black" if self.board.turn == chess.WHITE else "White"
+        outcome = self.board.outcome()
+        if outcome and outcome.termination == chess.Termination.CHECKMATE:
+            winner = "White" if outcome.winner == chess.WHITE else "Black"
             message = f"Checkmate! {winner} wins!"
-        elif self.board.is_stalemate():
-            message = "Stalemate - Draw!"
-        elif self.board.is_insufficient_material():
-            message = "Insufficient material - Draw!"
         else:
-            message = "Game Over - Draw!"
+            reason = TERMINATION_REASONS.get(outcome.termination if outcome else None, "Game Over")
+            message = f"{reason} - Draw!"
         
         self._update_status(message)
         messagebox.showinfo("Game Over", message)
@@ -752,11 +1069,17 @@ class ChessGUI:
         
         # Reset board and game state
         self.board = chess.Board()
+        self._legal_cache = None
+        self._reset_history()
+        self._game_epoch += 1
+        if self.engine:
+            self._warm_engine()
         self.selected_square = None
         self.valid_moves = []
         self.player_color = chess.WHITE if result else chess.BLACK
         self.game_in_progress = True
         self.hints_used = 0
+        self._analysis_var.set("")
         
         # Initialize time based on selected control
         time_control = self.time_control_var.get()
@@ -771,23 +1094,22 @@ class ChessGUI:
         
         # Clear history and evaluation
         self.history_text.delete(1.0, tk.END)
-        self.eval_label.config(text="Evaluation: 0.00")
+        self._history_shown = []
+        self._set_label_text(self.eval_label, "Evaluation: 0.00")
         self._update_hint_label()
-        self._update_clocks()
+        self._mark_dirty("board", "clocks")
         
         # Start the game
         if self.player_color == chess.BLACK:
             self._update_status("Engine thinking...")
-            self._draw_board()
             self.root.after(500, self._engine_move)
         else:
             self._update_status("Your turn - White")
-            self._draw_board()
     
     def _flip_board(self):
         """Flip the board orientation."""
         self.player_color = not self.player_color
-        self._draw_board()
+        self._mark_dirty("board")
     
     def _toggle_fullscreen(self):
         """Toggle fullscreen mode."""
@@ -803,10 +1125,10 @@ class ChessGUI:
     def _undo_move(self):
         """Undo the last two moves (player + engine)."""
         if len(self.board.move_stack) >= 2:
-            self.board.pop()
-            self.board.pop()
+            self._do_pop()
+            self._do_pop()
         elif len(self.board.move_stack) == 1:
-            self.board.pop()
+            self._do_pop()
         
         self.selected_square = None
         self.valid_moves = []
@@ -814,76 +1136,191 @@ class ChessGUI:
     
     def _get_hint(self):
         """Get a hint for the best move (limited to 5 per match)."""
-        if not self.stockfish:
-            messagebox.showinfo("Hint", "Engine not available")
+        if not self.engine:
+            self._analysis_var.set("Hint: engine not available")
             return
         
         if self.board.is_game_over():
-            messagebox.showinfo("Hint", "Game is over")
+            self._analysis_var.set("Hint: game is over")
             return
         
         if self.hints_used >= self.max_hints_per_game:
-            messagebox.showinfo(
-                "Hint",
+            self._analysis_var.set(
                 f"No hints remaining!\nYou have used {self.hints_used} / {self.max_hints_per_game} hints."
             )
             return
         
-        try:
-            self.stockfish.set_fen_position(self.board.fen())
-            best_move = self.stockfish.get_best_move_time(1000)
-            if best_move:
-                self.hints_used += 1
-                self._update_hint_label()
-                messagebox.showinfo("Hint", f"Best move: {best_move}")
-        except Exception as e:
-            messagebox.showinfo("Hint", f"Error: {e}")
+        if self._engine_busy:
+            return
+        
+        # Quick at low skill levels, up to about a second at full strength
+        limit = chess.engine.Limit(depth=self.HINT_DEPTH, time=(100 + 50 * self.skill_level) / 1000)
+        key = self._cache_key("hint", limit)
+        cached = self._cache_get(key)
+        if cached is not None:
+            self._show_hint(self._position_id, cached)
+            return
+        
+        position_id = self._position_id
+        
+        def done(move, error):
+            self._set_engine_busy(False)
+            if error is not None:
+                self._show_engine_error("Hint", error)
+            else:
+                self._show_hint(position_id, move)
+        
+        self._set_engine_busy(True)
+        self._submit("hint", limit, key, done)
+    
+    def _show_hint(self, position_id: int, move: Optional[str]):
+        """Show a hint (from the worker or the cache) and count it against the limit."""
+        # The position moved on while the engine was searching
+        if position_id != self._position_id or move is None:
+            return
+        
+        self.hints_used += 1
+        self._update_hint_label()
+        self._analysis_var.set(f"Hint\nBest move: {move}")
     
     def _analyze_position(self):
         """Analyze the current position."""
-        if not self.stockfish:
-            messagebox.showinfo("Analysis", "Engine not available")
+        if not self.engine:
+            self._analysis_var.set("Analysis: engine not available")
             return
         
-        try:
-            self.stockfish.set_fen_position(self.board.fen())
-            top_moves = self.stockfish.get_top_moves(5)
-            evaluation = self.stockfish.get_evaluation()
-            
-            analysis = "Position Analysis\n" + "=" * 30 + "\n\n"
-            
-            if evaluation["type"] == "cp":
-                score = evaluation["value"] / 100
-                analysis += f"Evaluation: {score:+.2f} pawns\n\n"
-            elif evaluation["type"] == "mate":
-                analysis += f"Mate in {evaluation['value']} moves!\n\n"
-            
-            analysis += "Top moves:\n"
-            for i, move_info in enumerate(top_moves, 1):
-                move = move_info.get("Move", "?")
-                cp = move_info.get("Centipawn")
-                mate = move_info.get("Mate")
-                
-                if mate is not None:
-                    analysis += f"{i}. {move} (Mate in {mate})\n"
-                elif cp is not None:
-                    analysis += f"{i}. {move} ({cp/100:+.2f})\n"
-                else:
-                    analysis += f"{i}. {move}\n"
-            
-            messagebox.showinfo("Analysis", analysis)
-        except Exception as e:
-            messagebox.showinfo("Analysis", f"Error: {e}")
+        if self._engine_busy:
+            return
+        
+        limit = chess.engine.Limit(time=self.ANALYSIS_TIME)
+        key = self._cache_key("analysis", limit)
+        cached = self._cache_get(key)
+        if cached is not None:
+            self._show_analysis(cached)
+            return
+        
+        def done(top_lines, error):
+            self._set_engine_busy(False)
+            if error is not None:
+                self._show_engine_error("Analysis", error)
+            else:
+                self._show_analysis(top_lines)
+        
+        self._set_engine_busy(True)
+        self._submit("analysis", limit, key, done)
+    
+    def _show_analysis(self, top_lines: List[list]):
+        """Show a MultiPV analysis given as [move, centipawns, mate] lines."""
+        parts = ["Position Analysis\n", "=" * 30, "\n\n"]
+        
+        if top_lines:
+            _, cp, mate = top_lines[0]
+            if mate is not None:
+                parts.append(f"Mate in {mate} moves!\n\n")
+            else:
+                parts.append(f"Evaluation: {cp / 100:+.2f} pawns\n\n")
+        
+        parts.append("Top moves:\n")
+        for i, (move, cp, mate) in enumerate(top_lines, 1):
+            if mate is not None:
+                parts.append(f"{i}. {move} (Mate in {mate})\n")
+            else:
+                parts.append(f"{i}. {move} ({cp / 100:+.2f})\n")
+        
+        self._analysis_var.set("".join(parts))
+    
+    def _show_engine_error(self, title: str, error: Exception):
+        """Report a failed search or engine option change."""
+        self._analysis_var.set(f"{title} error: {error}")
+    
+    def _cache_key(self, kind: str, limit: chess.engine.Limit) -> str:
+        """Cache key for a search of the current position.
+        
+        EPD leaves out the move counters, so the same position reached by
+        a different move order shares its entry.
+        """
+        return f"{kind}|{self._current_epd()}|skill={self.skill_level}|{limit!r}"
+    
+    def _current_epd(self) -> str:
+        """EPD of the current position, built once per position."""
+        position_id, epd = self._epd_cache
+        if position_id != self._position_id:
+            epd = self.board.epd()
+            self._epd_cache = (self._position_id, epd)
+        return epd
+    
+    def _cache_get(self, key: str):
+        """Look up a cached result, marking it as recently used."""
+        value = self._result_cache.get(key)
+        if value is not None:
+            self._result_cache.move_to_end(key)
+        return value
+    
+    def _cache_put(self, key: str, value):
+        """Remember a result, dropping the least recently used beyond the cap."""
+        self._result_cache[key] = value
+        self._result_cache.move_to_end(key)
+        while len(self._result_cache) > self.RESULT_CACHE_SIZE:
+            self._result_cache.popitem(last=False)
+    
+    def _set_engine_busy(self, busy: bool):
+        """Track a pending hint or analysis and grey out their buttons meanwhile."""
+        self._engine_busy = busy
+        state = ["disabled"] if busy else ["!disabled"]
+        self.hint_button.state(state)
+        self.analyze_button.state(state)
     
     def _on_difficulty_change(self, value):
         """Handle difficulty slider change."""
-        level = int(float(value))
+        # The slider reports every value it passes while dragged; only the
+        # one it settles on is sent to the engine
+        if self._skill_after_id:
+            self.root.after_cancel(self._skill_after_id)
+        self._skill_after_id = self.root.after(150, self._apply_skill, int(float(value)))
+    
+    def _apply_skill(self, level: int):
+        """Send the settled difficulty to the engine."""
+        self._skill_after_id = None
         self.skill_level = level
-        if self.stockfish:
+        if self.engine:
+            self._configure_engine({"Skill Level": level})
+    
+    def _engine_settings(self):
+        """Let the player change the engine's thread count and hash size."""
+        if not self.engine:
+            messagebox.showinfo("Engine Settings", "Engine not available")
+            return
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Engine Settings")
+        dialog.resizable(False, False)
+        dialog.transient(self.root)
+        
+        threads_var = tk.IntVar(value=self.engine_threads)
+        hash_var = tk.IntVar(value=self.engine_hash_mb)
+        
+        ttk.Label(dialog, text="Threads").grid(row=0, column=0, sticky="w", padx=8, pady=4)
+        ttk.Spinbox(
+            dialog, from_=1, to=os.cpu_count() or 1, textvariable=threads_var, width=8,
+        ).grid(row=0, column=1, padx=8, pady=4)
+        ttk.Label(dialog, text="Hash (MB)").grid(row=1, column=0, sticky="w", padx=8, pady=4)
+        ttk.Spinbox(
+            dialog, from_=16, to=hash_budget_mb(), increment=16, textvariable=hash_var, width=8,
+        ).grid(row=1, column=1, padx=8, pady=4)
+        
+        def apply():
             try:
-                self.stockfish.update_engine_parameters({"Skill Level": level})
-            except Exception:
-                pass
+                threads, hash_mb = threads_var.get(), hash_var.get()
+            except tk.TclError as e:
+                messagebox.showinfo("Engine Settings", f"Error: {e}", parent=dialog)
+                return
+            self._configure_engine({"Threads": threads, "Hash": hash_mb})
+            self.engine_threads, self.engine_hash_mb = threads, hash_mb
+            dialog.destroy()
+        
+        ttk.Button(dialog, text="Apply", command=apply, style="Accent.TButton").grid(
+            row=2, column=0, columnspan=2, sticky="ew", padx=8, pady=8,
+        )
     
     def _update_hint_label(self):
         """Update the hint usage label."""
@@ -898,17 +1335,26 @@ class ChessGUI:
             return "∞"
         
         total_seconds = max(0, ms // 1000)
-        minutes = total_seconds // 60
-        seconds = total_seconds % 60
-        return f"{minutes}:{seconds:02d}"
+        text = self._time_texts.get(total_seconds)
+        if text is None:
+            if len(self._time_texts) >= 4096:
+                self._time_texts.clear()
+            minutes, seconds = divmod(total_seconds, 60)
+            text = self._time_texts[total_seconds] = f"{minutes}:{seconds:02d}"
+        return text
     
     def _update_clocks(self):
         """Update the clock display."""
         white_time_str = self._format_time(self.white_time_ms)
         black_time_str = self._format_time(self.black_time_ms)
         
-        self.white_clock_label.config(text=white_time_str)
-        self.black_clock_label.config(text=black_time_str)
+        # The labels follow their StringVars; set them only on a change
+        if white_time_str != self._white_clock_text:
+            self._white_clock_var.set(white_time_str)
+            self._white_clock_text = white_time_str
+        if black_time_str != self._black_clock_text:
+            self._black_clock_var.set(black_time_str)
+            self._black_clock_text = black_time_str
     
     def _start_clock_for_current_player(self):
         """Start the clock countdown for the current player."""
@@ -918,41 +1364,80 @@ class ChessGUI:
         time_control = self.time_control_var.get()
         if time_control == "no_limit" or not self.game_in_progress:
             return
+        # Picking a time control mid-game only applies from the next new game
+        if self.white_time_ms is None or self.black_time_ms is None:
+            return
+        
+        self._clock_side = self.board.turn
+        self._clock_started = time.monotonic()
+        shown = self._clock_seconds()
         
         def tick():
+            nonlocal shown
             if self.game_in_progress:
-                if self.board.turn == chess.WHITE:
-                    if self.white_time_ms is not None:
-                        self.white_time_ms -= 100
-                        if self.white_time_ms <= 0:
-                            self.white_time_ms = 0
-                            self._end_game_on_timeout("Black", "White out of time!")
-                            return
-                else:
-                    if self.black_time_ms is not None:
-                        self.black_time_ms -= 100
-                        if self.black_time_ms <= 0:
-                            self.black_time_ms = 0
-                            self._end_game_on_timeout("White", "Black out of time!")
-                            return
+                self._charge_clock()
+                if self.white_time_ms is not None and self.white_time_ms <= 0:
+                    self.white_time_ms = 0
+                    self._end_game_on_timeout("Black", "White out of time!")
+                    return
+                if self.black_time_ms is not None and self.black_time_ms <= 0:
+                    self.black_time_ms = 0
+                    self._end_game_on_timeout("White", "Black out of time!")
+                    return
                 
-                self._update_clocks()
-                self.clock_job_id = self.root.after(100, tick)
+                # Redraw through the idle flush, and only when a digit changed
+                seconds = self._clock_seconds()
+                if seconds != shown:
+                    shown = seconds
+                    self._mark_dirty("clocks")
+                self.clock_job_id = self.root.after(self._next_tick_ms(), tick)
+        
+        self.clock_job_id = self.root.after(self._next_tick_ms(), tick)
+    
+    def _next_tick_ms(self) -> int:
+        """Milliseconds until the running clock next shows a different second."""
+        remaining = self.white_time_ms if self._clock_side == chess.WHITE else self.black_time_ms
+        return remaining % 1000 + 1
+    
+    def _clock_seconds(self) -> Tuple[Optional[int], Optional[int]]:
+        """Whole seconds left on each clock, as the display shows them."""
+        return (
+            None if self.white_time_ms is None else self.white_time_ms // 1000,
+            None if self.black_time_ms is None else self.black_time_ms // 1000,
+        )
+    
+    def _charge_clock(self):
+        """Deduct the time elapsed since the last charge from the running clock.
         
-        self.clock_job_id = self.root.after(100, tick)
+        Measuring against the monotonic clock keeps the countdown true to wall
+        time however late Tk runs the tick callbacks.
+        """
+        if self._clock_side is None:
+            return
+        now = time.monotonic()
+        elapsed_ms = int((now - self._clock_started) * 1000)
+        # Carry the sub-millisecond remainder into the next charge
+        self._clock_started += elapsed_ms / 1000
+        if self._clock_side == chess.WHITE:
+            if self.white_time_ms is not None:
+                self.white_time_ms -= elapsed_ms
+        elif self.black_time_ms is not None:
+            self.black_time_ms -= elapsed_ms
     
     def _stop_clock(self):
         """Stop the active clock."""
         if self.clock_job_id:
             self.root.after_cancel(self.clock_job_id)
             self.clock_job_id = None
+        self._charge_clock()
+        self._clock_side = None
     
     def _end_game_on_timeout(self, winner: str, message: str):
         """End game due to timeout."""
         self.game_in_progress = False
         self._stop_clock()
         self._update_status(message)
-        messagebox.showinfo("Time Over", f"Game Over!\n{winner} wins!\n{message}")
+        self._analysis_var.set(f"Time Over\n{winner} wins!\n{message}")
 
 
 def main():
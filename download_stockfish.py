@@ -4,6 +4,7 @@ Downloads and sets up Stockfish chess engine for Windows.
 """
 
 import os
+import re
 import sys
 import urllib.request
 import zipfile
@@ -12,6 +13,41 @@ import shutil
 STOCKFISH_URL = "https://github.com/official-stockfish/Stockfish/releases/download/sf_17/stockfish-windows-x86-64-avx2.zip"
 STOCKFISH_FALLBACK_URL = "https://github.com/official-stockfish/Stockfish/releases/download/sf_17/stockfish-windows-x86-64.zip"
 
+# Read/write size for streaming the archive and the executable
+CHUNK_SIZE = 1 << 20
+
+# The engine binary anywhere in the archive, e.g. stockfish/stockfish-windows-x86-64-avx2.exe
+STOCKFISH_EXE_PATTERN = re.compile(r"(?:^|/)stockfish[^/]*\.exe$", re.IGNORECASE)
+
+
+def _download(url: str, path: str):
+    """Stream url to path in fixed-size chunks.
+    
+    Raises ValueError (after removing the partial file) if the download is
+    shorter than its Content-Length. This only catches truncation; the
+    archive's contents are not verified.
+    """
+    received = 0
+    try:
+        with urllib.request.urlopen(url) as response, open(path, "wb") as out:
+            expected_size = response.headers.get("Content-Length")
+            while True:
+                chunk = response.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                out.write(chunk)
+                received += len(chunk)
+        
+        if expected_size is not None and received != int(expected_size):
+            raise ValueError(f"download truncated ({received} of {expected_size} bytes)")
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    
+    print(f"Downloaded {received} bytes")
+
+
 def download_stockfish():
     """Download and extract Stockfish."""
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -22,18 +58,17 @@ def download_stockfish():
         return stockfish_exe
     
     zip_path = os.path.join(script_dir, "stockfish.zip")
-    extract_dir = os.path.join(script_dir, "stockfish_temp")
     
     print("Downloading Stockfish (this may take a moment)...")
     
     try:
         # Try AVX2 version first (faster on modern CPUs)
-        urllib.request.urlretrieve(STOCKFISH_URL, zip_path)
+        _download(STOCKFISH_URL, zip_path)
     except Exception as e:
         print(f"AVX2 version failed: {e}")
         print("Trying fallback version...")
         try:
-            urllib.request.urlretrieve(STOCKFISH_FALLBACK_URL, zip_path)
+            _download(STOCKFISH_FALLBACK_URL, zip_path)
         except Exception as e2:
             print(f"Download failed: {e2}")
             print("\nPlease download Stockfish manually from:")
@@ -43,33 +78,33 @@ def download_stockfish():
     
     print("Extracting Stockfish...")
     
+    # Written under a temporary name and moved into place only once complete:
+    # zipfile checks the CRC at the end of the member, and a half-written
+    # stockfish.exe would make the next run skip the download
+    partial_exe = stockfish_exe + ".part"
     try:
+        # Copy just the executable out of the archive rather than extracting
+        # everything and searching the extracted tree for it
         with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(extract_dir)
-        
-        # Find stockfish.exe in extracted files
-        for root, dirs, files in os.walk(extract_dir):
-            for file in files:
-                if file.lower() == "stockfish.exe" or file.lower().startswith("stockfish"):
-                    if file.endswith(".exe"):
-                        src = os.path.join(root, file)
-                        shutil.copy2(src, stockfish_exe)
-                        print(f"Stockfish installed to {stockfish_exe}")
-                        break
-        
-        # Cleanup
-        os.remove(zip_path)
-        shutil.rmtree(extract_dir, ignore_errors=True)
+            for name in zip_ref.namelist():
+                if STOCKFISH_EXE_PATTERN.search(name):
+                    with zip_ref.open(name) as src, open(partial_exe, "wb") as dst:
+                        shutil.copyfileobj(src, dst, length=CHUNK_SIZE)
+                    os.replace(partial_exe, stockfish_exe)
+                    print(f"Stockfish installed to {stockfish_exe}")
+                    return stockfish_exe
         
-        if os.path.exists(stockfish_exe):
-            return stockfish_exe
-        else:
-            print("Could not find stockfish.exe in downloaded archive")
-            return None
+        print("Could not find stockfish.exe in downloaded archive")
+        return None
             
     except Exception as e:
         print(f"Error extracting: {e}")
         return None
+    finally:
+        # Cleanup
+        for path in (partial_exe, zip_path):
+            if os.path.exists(path):
+                os.remove(path)
 
 
 if __name__ == "__main__":
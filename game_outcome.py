@@ -0,0 +1,17 @@
+"""
+Game Outcome
+How finished games are described by the web app, the CLI engine and the GUI.
+"""
+
+import chess
+
+# Why a game ended, keyed by chess.Termination. Outcomes come from
+# board.outcome() without claim_draw, so only draws that end the game on
+# their own (not the claimable 50-move rule or threefold repetition) occur
+TERMINATION_REASONS = {
+    chess.Termination.CHECKMATE: "Checkmate",
+    chess.Termination.STALEMATE: "Stalemate",
+    chess.Termination.INSUFFICIENT_MATERIAL: "Insufficient material",
+    chess.Termination.SEVENTYFIVE_MOVES: "75-move rule",
+    chess.Termination.FIVEFOLD_REPETITION: "Fivefold repetition",
+}
@@ -0,0 +1,37 @@
+"""
+Stockfish Hash Sizing
+Picks the transposition table size used by the web app, the CLI engine and the GUI.
+"""
+
+from typing import Optional
+
+# Hash tables may use up to a quarter of available memory, within these bounds
+HASH_MB_DEFAULT = 256
+HASH_MB_MIN = 16
+HASH_MB_MAX = 1024
+
+
+def _available_memory() -> Optional[int]:
+    """Bytes the kernel could hand out without swapping, or None if unknown.
+    
+    MemAvailable counts reclaimable page cache, unlike free memory, which
+    shrinks towards nothing on a long-running host.
+    """
+    try:
+        with open("/proc/meminfo", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    # Not Linux, or a kernel too old to report it
+    return None
+
+
+def hash_budget_mb(engines: int = 1) -> int:
+    """Hash size per engine in MB, scaled to the memory currently available."""
+    available = _available_memory()
+    if available is None:
+        return HASH_MB_DEFAULT
+    budget = min(HASH_MB_MAX, available // (4 * 1024 * 1024)) // max(1, engines)
+    return max(HASH_MB_MIN, budget)
@@ -0,0 +1,35 @@
+"""
+Stockfish Locator
+Finds the Stockfish binary used by the web app, the CLI engine and the GUI.
+"""
+
+import os
+import platform
+import shutil
+from typing import Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+if platform.system() == "Windows":
+    STOCKFISH_PATHS = [
+        os.path.join(SCRIPT_DIR, "stockfish.exe"),
+        "stockfish.exe",
+        r"C:\stockfish\stockfish.exe",
+        r"C:\Program Files\Stockfish\stockfish.exe",
+    ]
+else:
+    STOCKFISH_PATHS = [
+        os.path.join(SCRIPT_DIR, "stockfish"),
+        "stockfish",
+        "/usr/bin/stockfish",
+        "/usr/local/bin/stockfish",
+        "/usr/games/stockfish",
+    ]
+
+
+def find_stockfish() -> Optional[str]:
+    """Return the first Stockfish binary found in the usual locations or on PATH."""
+    for path in STOCKFISH_PATHS:
+        if os.path.isfile(path):
+            return path
+    return shutil.which("stockfish")
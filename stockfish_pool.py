@@ -0,0 +1,167 @@
+"""
+Stockfish Engine Pool
+Long-lived Stockfish processes shared by every game the web app hosts.
+"""
+
+import asyncio
+import os
+import threading
+from contextlib import contextmanager
+from queue import Queue, Empty
+from typing import Optional
+
+import chess.engine
+
+from stockfish_hash import hash_budget_mb
+
+# Split the machine's cores between the pooled engines
+THREADS_PER_ENGINE = 2
+POOL_SIZE = max(1, (os.cpu_count() or 2) // THREADS_PER_ENGINE)
+
+# How long a request waits on a busy pool before checking for a freed slot
+ACQUIRE_RECHECK_SECONDS = 1.0
+
+
+class StockfishPool:
+    """A bounded set of Stockfish engines that requests check out and return.
+
+    All engines are driven by one event loop on a daemon thread, so a request
+    thread waiting on a search does not hold the GIL and the process can exit
+    without shutting the engines down first. That thread never works on its
+    own: every coroutine it runs was submitted by a request thread that is
+    blocked on the result. It therefore only runs while a request is being
+    served, unlike an idle-game reaper, which would have to wake between
+    requests when a PythonAnywhere web worker may not be scheduling it.
+    python-chess's own SimpleEngine.popen_uci uses the same kind of thread.
+
+    Engines are handed from game to game without ucinewgame (python-chess only
+    sends it for the first search, or when the game argument changes), since
+    Stockfish clears its hash table on ucinewgame. Opening positions analysed
+    for one game therefore stay in the table for the next.
+    """
+
+    def __init__(self, path: Optional[str], size: int = POOL_SIZE,
+                 threads: Optional[int] = None, hash_mb: Optional[int] = None):
+        """
+        Create an empty pool; engines are started on demand.
+
+        Args:
+            path: Stockfish binary, or None if it is not installed
+            size: Maximum number of engine processes
+            threads: Search threads per engine (defaults to cores / size)
+            hash_mb: Transposition table size per engine in MB (defaults to
+                a share of available memory)
+        """
+        self.path = path
+        self.size = size
+        self.threads = threads or max(1, (os.cpu_count() or 2) // size)
+        self.hash_mb = hash_mb or hash_budget_mb(size)
+        self._idle = Queue()
+        self._lock = threading.Lock()
+        self._count = 0
+        self._loop = None
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the engines' event loop thread the first time it is needed."""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(target=self._loop.run_forever, name="stockfish-pool", daemon=True).start()
+        return self._loop
+
+    def _create(self) -> Optional[chess.engine.SimpleEngine]:
+        """Start a new Stockfish process, or return None if that is not possible."""
+        if not self.path:
+            return None
+
+        try:
+            future = asyncio.run_coroutine_threadsafe(chess.engine.popen_uci(self.path), self._event_loop())
+            transport, protocol = future.result(timeout=10)
+            engine = chess.engine.SimpleEngine(transport, protocol)
+            engine.configure({
+                "Threads": self.threads,
+                "Hash": self.hash_mb,
+            })
+            return engine
+        except Exception as e:
+            print(f"Stockfish error: {e}")
+            return None
+
+    def warm(self):
+        """Start every engine now so early requests find them ready.
+
+        Runs in the caller's thread (the WSGI import), so a worker pays the
+        start-up cost once at boot and leaves nothing running in the background.
+        """
+        while True:
+            with self._lock:
+                if self._count >= self.size:
+                    return
+                engine = self._create()
+                if engine is None:
+                    return
+                self._count += 1
+            try:
+                # isready makes Stockfish load its network before the first search
+                engine.ping()
+            except Exception as e:
+                # Give the slot back so _acquire starts a fresh engine
+                # instead of waiting for this one to come back
+                print(f"Stockfish error: {e}")
+                with self._lock:
+                    self._count -= 1
+                try:
+                    engine.close()
+                except Exception:
+                    pass
+                return
+            self._idle.put(engine)
+
+    def _acquire(self) -> Optional[chess.engine.SimpleEngine]:
+        """Take an idle engine, start a new one, or wait for one to be returned."""
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except Empty:
+                pass
+
+            with self._lock:
+                if self._count < self.size:
+                    engine = self._create()
+                    if engine:
+                        self._count += 1
+                        return engine
+                if self._count == 0:
+                    return None
+            try:
+                # Check again now and then: an engine that failed frees its
+                # slot without ever coming back to the idle queue
+                return self._idle.get(timeout=ACQUIRE_RECHECK_SECONDS)
+            except Empty:
+                pass
+
+    @contextmanager
+    def checkout(self, skill_level: int):
+        """Borrow an engine set to the given skill level.
+
+        Yields None when no engine can be started. Engines that raise while
+        checked out are discarded instead of being returned to the pool.
+        """
+        engine = self._acquire()
+        if engine is None:
+            yield None
+            return
+
+        try:
+            # Only sent to the engine when the level actually changes
+            engine.configure({"Skill Level": skill_level})
+            yield engine
+        except BaseException:
+            with self._lock:
+                self._count -= 1
+            try:
+                engine.close()
+            except Exception:
+                pass
+            raise
+        else:
+            self._idle.put(engine)
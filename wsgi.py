@@ -4,11 +4,20 @@ Do not modify unless you know what you're doing
 """
 
 import sys
-import os
+import traceback
+from pathlib import Path
 
 # Add the directory containing app.py to the Python path
-path = os.path.dirname(os.path.abspath(__file__))
-if path not in sys.path:
-    sys.path.insert(0, path)
+APP_DIR = str(Path(__file__).resolve().parent)
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
 
-from app import app as application
+try:
+    from app import app as application, stockfish_pool
+except Exception:
+    # Put the real cause in the error log before the server reports its own failure
+    traceback.print_exc(file=sys.stderr)
+    raise
+
+# Start the engines now rather than on the first request
+stockfish_pool.warm()